@@ -0,0 +1,262 @@
+"""
+run_benchmarks.py
+Headless benchmarks of the simulation hot paths. Times PersonScheduler construction, Elevator.step_realistic_physics,
+Simulator.rl_step throughput, get_state and the reward functions over a matrix of floors, cars and arrival densities,
+and writes the results as JSON.
+
+Usage (from the repository root):
+    python benchmarks/run_benchmarks.py --output bench.json
+    python benchmarks/run_benchmarks.py --quick --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy as np
+
+from src.Person import Person
+from src.PersonScheduler import PersonScheduler
+from src.building import Building
+from src.elevator import Elevator
+from src.simulator import Simulator, realistic_physics_step_func, reward_sum_people, reward_sum_wait_time, \
+    rl_step_func_multi, rl_step_func_v1
+
+FULL_MATRIX = {
+    "horizons": [10000, 100000, 1000000],
+    "floors": [10, 50, 200],
+    "cars": [1, 4, 16, 48],
+    "densities": [.05, .5, 2.0],
+}
+
+QUICK_MATRIX = {
+    "horizons": [10000, 100000],
+    "floors": [10, 50],
+    "cars": [1, 8],
+    "densities": [.05, .5],
+}
+
+
+def make_building(n_floors, n_cars, board_at_last_stop=False):
+    return Building(name=0, elevators=[Elevator(elevator_num) for elevator_num in range(0, n_cars)], n_floors=n_floors,
+                    board_at_last_stop=board_at_last_stop)
+
+
+def spawn_random_people(building, rnd, n_people):
+    for _ in range(0, n_people):
+        floor_num = rnd.randrange(building.n_floors)
+        destination = (floor_num + 1 + rnd.randrange(building.n_floors - 1)) % building.n_floors
+        building.add_waiting_person(Person(floor_num, destination))
+
+
+def queue_idle_cars(building, rnd):
+    # Keeps every car busy: an idle car is sent to a random floor, then to a second one so that it loads people
+    for elevator in building.elevators:
+        if len(elevator.queued_floors) == 0:
+            elevator.queued_floors.append(building.floors[rnd.randrange(building.n_floors)])
+            elevator.queued_floors.append(building.floors[rnd.randrange(building.n_floors)])
+
+
+def bench_person_scheduler(horizon, density, n_floors=10, repeats=3):
+    """
+    Times PersonScheduler construction (generating every arrival of the horizon).
+    """
+    building = make_building(n_floors, 1)
+    timings = []
+    for _ in range(0, repeats):
+        start_time = time.perf_counter()
+        person_scheduler = PersonScheduler(building, poisson_mean_density=density, p_seed=1,
+                                           seconds_to_schedule=horizon)
+        timings.append(time.perf_counter() - start_time)
+    return {
+        "seconds_per_call": min(timings),
+        "n_arrivals": len(person_scheduler.spawn_times),
+    }
+
+
+def bench_elevator_physics(n_floors, n_cars, density, n_steps=300, time_inc=1.0):
+    """
+    Times Elevator.step_realistic_physics on busy cars with people arriving at density people per second.
+    """
+    rnd = random.Random(0)
+    building = make_building(n_floors, n_cars)
+    elapsed = 0.0
+    n_arrivals_per_step = np.random.default_rng(0).poisson(density * time_inc, n_steps)
+    for step_num in range(0, n_steps):
+        spawn_random_people(building, rnd, int(n_arrivals_per_step[step_num]))
+        queue_idle_cars(building, rnd)
+        start_time = time.perf_counter()
+        for elevator in building.elevators:
+            elevator.step_realistic_physics(building, time_inc)
+        elapsed += time.perf_counter() - start_time
+        building.clock += time_inc
+    return {
+        "seconds_per_call": elapsed / (n_steps * n_cars),
+        "sim_seconds_per_wall_second": n_steps * time_inc / elapsed,
+        "n_delivered": len(building.delivered_wait_times),
+    }
+
+
+def bench_rl_step(n_floors, n_cars, density, n_steps=2000, reward_func=reward_sum_people):
+    """
+    Times Simulator.rl_step: rl_step_func_v1 for a single car, sent to floors in turn; rl_step_func_multi for several,
+    each car that needs an action sent to floors in turn (from a different starting floor per car). Only the rl_step
+    calls are timed.
+    """
+    multi = n_cars > 1
+    building = make_building(n_floors, n_cars, board_at_last_stop=multi)
+    sim = Simulator('bench', step_func=realistic_physics_step_func, reward_func=reward_func,
+                    rl_step_func=rl_step_func_multi if multi else rl_step_func_v1)
+    sim.init_building(building)
+    person_scheduler = PersonScheduler(building, poisson_mean_density=density, p_seed=1,
+                                       seconds_to_schedule=float("inf"), chunk_seconds=3600)
+    action = [None] * n_cars
+    elapsed = 0.0
+    for step_num in range(0, n_steps):
+        if multi:
+            for elevator_index in range(0, n_cars):
+                action[elevator_index] = None
+            for elevator_index in sim.get_elevators_needing_action():
+                action[elevator_index] = (step_num + 1 + elevator_index * n_floors // n_cars) % n_floors
+            step_action = action
+        else:
+            step_action = (step_num + 1) % n_floors
+        start_time = time.perf_counter()
+        sim.rl_step(starting_time=sim.total_time, action=step_action, person_scheduler=person_scheduler)
+        elapsed += time.perf_counter() - start_time
+    return {
+        "seconds_per_call": elapsed / n_steps,
+        "sim_seconds_per_wall_second": sim.total_time / elapsed,
+        "people_in_system": building.get_total_people_in_system(),
+    }
+
+
+def bench_observation(n_floors, n_cars, people_per_floor=20, n_calls=2000):
+    """
+    Times get_state and the reward functions on a building with people waiting on every floor and riding every car.
+    Returns -- dict of function name -> measurements
+    """
+    rnd = random.Random(0)
+    building = make_building(n_floors, n_cars)
+    sim = Simulator('bench', step_func=realistic_physics_step_func)
+    sim.init_building(building)
+    spawn_random_people(building, rnd, people_per_floor * n_floors)
+    for elevator in building.elevators:
+        elevator.queued_floors[:] = [building.floors[0], building.floors[1]]
+        elevator.load_unload(0, building, time_remaining=0, time_inc=0)
+
+    results = dict()
+    for name, func in [("get_state", sim.get_state), ("reward_sum_people", lambda: reward_sum_people(sim)),
+                       ("reward_sum_wait_time", lambda: reward_sum_wait_time(sim))]:
+        start_time = time.perf_counter()
+        for _ in range(0, n_calls):
+            func()
+        results[name] = {"seconds_per_call": (time.perf_counter() - start_time) / n_calls}
+    return results
+
+
+def run_benchmarks(matrix, scale=1.0, log=print):
+    """
+    Runs every benchmark over the matrix. scale multiplies the number of steps/calls of each benchmark.
+    Returns -- list of result dicts, each with "benchmark" and "params" keys plus the measurements
+    """
+    results = []
+
+    def record(benchmark, params, measurements):
+        results.append(dict(benchmark=benchmark, params=params, **measurements))
+        log(benchmark + " " + json.dumps(params) + " " + json.dumps(measurements))
+
+    for horizon in matrix["horizons"]:
+        for density in matrix["densities"]:
+            record("person_scheduler_construction", {"horizon": horizon, "density": density},
+                   bench_person_scheduler(horizon, density))
+
+    n_steps = max(int(300 * scale), 1)
+    for n_floors in matrix["floors"]:
+        for n_cars in matrix["cars"]:
+            for density in matrix["densities"]:
+                params = {"floors": n_floors, "cars": n_cars, "density": density}
+                record("elevator_step_realistic_physics", params,
+                       bench_elevator_physics(n_floors, n_cars, density, n_steps=n_steps))
+
+    n_steps = max(int(2000 * scale), 1)
+    for n_floors in matrix["floors"]:
+        for n_cars in matrix["cars"]:
+            for density in matrix["densities"]:
+                record("rl_step", {"floors": n_floors, "cars": n_cars, "density": density},
+                       bench_rl_step(n_floors, n_cars, density, n_steps=n_steps))
+
+    n_calls = max(int(2000 * scale), 1)
+    for n_floors in matrix["floors"]:
+        for n_cars in matrix["cars"]:
+            for name, measurements in bench_observation(n_floors, n_cars, n_calls=n_calls).items():
+                record(name, {"floors": n_floors, "cars": n_cars}, measurements)
+    return results
+
+
+def get_metadata():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                         stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+    }
+
+
+def compare_results(baseline, results, threshold=1.25):
+    """
+    Compares the seconds_per_call of matching benchmarks (same name and params).
+    Returns -- list of (benchmark, params, ratio) where the new time is more than threshold times the baseline time
+    """
+    baseline_times = {(result["benchmark"], json.dumps(result["params"], sort_keys=True)): result["seconds_per_call"]
+                      for result in baseline["results"] if "seconds_per_call" in result}
+    regressions = []
+    for result in results:
+        key = (result["benchmark"], json.dumps(result["params"], sort_keys=True))
+        if key in baseline_times and "seconds_per_call" in result and baseline_times[key] > 0:
+            ratio = result["seconds_per_call"] / baseline_times[key]
+            if ratio > threshold:
+                regressions.append((result["benchmark"], result["params"], ratio))
+    return regressions
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Headless benchmarks of the elevator simulation.")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file to write the results to")
+    parser.add_argument("--quick", action="store_true", help="smaller matrix and fewer steps (smoke run)")
+    parser.add_argument("--compare", help="earlier JSON results; exits with status 1 if anything got slower")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="slowdown ratio counted as a regression by --compare (default 1.25)")
+    args = parser.parse_args(argv)
+
+    matrix = QUICK_MATRIX if args.quick else FULL_MATRIX
+    results = run_benchmarks(matrix, scale=.2 if args.quick else 1.0)
+    with open(args.output, "w") as output_file:
+        json.dump({"metadata": get_metadata(), "matrix": matrix, "results": results}, output_file, indent=2)
+    print("Wrote " + str(len(results)) + " results to " + args.output)
+
+    if args.compare is not None:
+        with open(args.compare) as baseline_file:
+            regressions = compare_results(json.load(baseline_file), results, args.threshold)
+        for benchmark, params, ratio in regressions:
+            print("REGRESSION " + benchmark + " " + json.dumps(params) + " " + str(round(ratio, 2)) + "x slower")
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
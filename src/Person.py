@@ -21,8 +21,13 @@ class Person:
         """
         self.floor = floor
         self.destination = destination
-        self.wait_time = 0  # includes time from first waiting for elevator to time getting off
         self.waiting_state = -2  # -2 = waiting for the elevator, -1 = waiting in the elevator, 0 = arrived
+        self.queue_number = 0  # order of arrival among the people waiting on the floor (set by Floor.add_person)
+
+        # Timestamps on the Building.clock; None until it happens. Wait/ride times are derived from them.
+        self.spawn_time = 0.0  # started waiting for the elevator (set by Building.add_waiting_person)
+        self.board_time = None  # got on an elevator
+        self.alight_time = None  # got off at the destination
 
     def elevator_stop(self, elevator, floor, direction):
         """
@@ -48,9 +53,42 @@ class Person:
             elevator.remove_rider(self)
             self.waiting_state = 0
 
-    def step(self):
+    def get_wait_time(self, current_time):
+        """
+        Returns the time from first waiting for the elevator to getting off (or to current_time if still in the system).
+
+        Arguments:
+        current_time -- the Building.clock now
+        """
+        end_time = current_time if self.alight_time is None else self.alight_time
+        return end_time - self.spawn_time
+
+    def get_hall_wait_time(self, current_time):
+        """
+        Returns the time spent waiting on the floor, up to boarding (or to current_time if not boarded yet).
+        """
+        end_time = current_time if self.board_time is None else self.board_time
+        return end_time - self.spawn_time
+
+    def get_ride_time(self, current_time):
+        """
+        Returns the time spent on the elevator (0 if not boarded yet).
+        """
+        if self.board_time is None:
+            return 0
+        end_time = current_time if self.alight_time is None else self.alight_time
+        return end_time - self.board_time
+
+    def snapshot(self):
+        """
+        Returns a flat tuple holding this person and its mutable fields (see Simulator.snapshot).
+        """
+        return self, self.floor, self.waiting_state, self.spawn_time, self.board_time, self.alight_time
+
+    @staticmethod
+    def restore(token):
         """
-        Time step function, increments waiting time
+        Puts the person stored in a token from snapshot back into that state and returns it.
         """
-        if self.waiting_state != 0:
-            self.wait_time += 1
+        person, person.floor, person.waiting_state, person.spawn_time, person.board_time, person.alight_time = token
+        return person
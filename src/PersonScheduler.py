@@ -3,11 +3,9 @@ Author: Austin Day
 PersonScheduler.py
 """
 import numpy as np
-import scipy.stats
-import matplotlib.pyplot as plt
-import math
 
 from src.Person import Person
+from src.random_streams import as_seed_sequence
 
 
 class PersonScheduler:
@@ -16,32 +14,62 @@ class PersonScheduler:
     Defines the scheduling for arrival and destinations of elevator passengers
     """
 
-    def __init__(self, building, poisson_mean_density=.2, p_seed=1, seconds_to_schedule=100000):
+    def __init__(self, building, poisson_mean_density=.2, p_seed=1, seconds_to_schedule=100000, chunk_seconds=None,
+                 start_seconds=0):
         """
         Creates a PersonScheduler object.
 
         Arguments:
         building -- The building object for the simulation
         poisson_mean_density -- intensity (ie mean density) of the Poisson process; ==1 is mean 1 per second
-        p_seed -- numpy RNG seed to give the same results with the same parameters
+        p_seed -- seed of the scheduler's own np.random.Generator (int or np.random.SeedSequence, e.g. from
+                  random_streams.replica_seed_sequence); the same seed gives the same arrivals
+        seconds_to_schedule -- no one spawns after this time (may be float("inf") when chunk_seconds is given)
+        chunk_seconds -- if given, arrivals are generated lazily chunk_seconds at a time instead of all at once, so
+                         memory stays bounded however long the simulation runs
+        start_seconds -- no one spawns before this time (e.g. to sample only the arrivals after the current time)
         """
 
         self.building = building
         self.poisson_mean_density = poisson_mean_density
         self.p_seed = p_seed
         self.seconds_to_schedule = seconds_to_schedule
-        self.people_spawning = []
-        self.people_spawning_min_index = 0
+        self.chunk_seconds = chunk_seconds
+        self.start_seconds = start_seconds
+        self.spawn_times = None  # time column of the arrivals (sorted)
+        self.spawn_starting_floors = None  # starting floor column
+        self.spawn_dest_floors = None  # destination floor column
+        self.spawn_ids = None  # id column (row number)
+
+        self.rng = None  # np.random.Generator seeded by p_seed; nothing else draws from it
+
+        # Streaming mode only: the columns hold the arrivals in [chunk_start, chunk_end)
+        self.chunk_start = 0
+        self.chunk_end = 0
+        self.n_generated = 0  # number of arrivals in all the chunks before the current one
+
+        if chunk_seconds is None and seconds_to_schedule == float("inf"):
+            raise ValueError("An unbounded seconds_to_schedule needs chunk_seconds")
 
         self.setup_distribution()
 
     def setup_distribution(self):
+        self.rng = np.random.default_rng(as_seed_sequence(self.p_seed))
+        if self.chunk_seconds is not None:
+            # Streaming mode: the first chunk is generated now, the others as the simulation reaches them
+            self.spawn_times = None
+            self.chunk_start = self.start_seconds
+            self.chunk_end = self.start_seconds
+            self.n_generated = 0
+            self.generate_next_chunk()
+            return
+
         # Simulation window parameters
-        x_min = 0
+        x_min = self.start_seconds
         x_max = self.seconds_to_schedule
         y_min = 0
         y_max = self.building.n_floors  # num_floors
-        x_delta = x_max - x_min
+        x_delta = max(x_max - x_min, 0)
         y_delta = y_max - y_min  # rectangle dimensions
         # area_total = x_delta * y_delta
 
@@ -50,80 +78,122 @@ class PersonScheduler:
         lambda0 = self.poisson_mean_density
 
         # Simulate Poisson point process
-        np.random.seed(self.p_seed)
-        num_points = scipy.stats.poisson(lambda0 * x_delta).rvs()  # Poisson number of points
-        xx = x_delta * scipy.stats.uniform.rvs(0, 1, (num_points, 1)) + x_min  # x-coors of Poisson points
-        xx_new = []
-        for val in xx:
-            xx_new.append(val[0])
-        xx_new.sort()
-        yy = y_delta * scipy.stats.uniform.rvs(0, 1, (num_points, 1)) + y_min  # y-coor: starting floor
-        zz = y_delta * scipy.stats.uniform.rvs(0, 1, (num_points, 1)) + y_min  # z-coor: destination floor
-
-        for val_arr in yy:
-            val_arr[0] = int(math.floor(val_arr[0]))
-        for val_arr in zz:
-            val_arr[0] = int(math.floor(val_arr[0]))
-
-        for i in range(0, len(xx)):
-            starting_floor = int(math.floor(yy[i][0]))
-            dest_floor = int(math.floor(zz[i][0]))
-
-            # Not allowing pressing the same floor as the person is on
-            if dest_floor == starting_floor:
-                if dest_floor != 0:
-                    dest_floor -= 1
-                else:
-                    dest_floor += 1
-
-            self.people_spawning.append({
-                "time": xx_new[i],
-                "starting_floor": starting_floor,
-                "dest_floor": dest_floor,
-                "index": i
-            })
-
-    # Can be called after a simulator step to cut down on array search time (optional but much more efficient)
-    def update_people_spawning_min_index(self, min_index):
-        self.people_spawning_min_index = min_index
+        num_points = self.rng.poisson(lambda0 * x_delta)  # Poisson number of points
+        xx = x_delta * self.rng.random(num_points) + x_min  # x-coors of Poisson points
+        yy = y_delta * self.rng.random(num_points) + y_min  # y-coor: starting floor
+        zz = y_delta * self.rng.random(num_points) + y_min  # z-coor: destination floor
+
+        self.set_arrival_columns(xx, yy, zz)
+
+    # Replaces the columns with the arrivals of the next chunk_seconds (streaming mode). A Poisson process restricted
+    # to disjoint windows is independent per window, so the chunks together are a Poisson process over all time.
+    def generate_next_chunk(self):
+        self.n_generated += len(self.spawn_times) if self.spawn_times is not None else 0
+        self.chunk_start = self.chunk_end
+        self.chunk_end = min(self.chunk_start + self.chunk_seconds, self.seconds_to_schedule)
+        x_delta = self.chunk_end - self.chunk_start
+        y_delta = self.building.n_floors
+
+        num_points = self.rng.poisson(self.poisson_mean_density * x_delta)
+        xx = x_delta * self.rng.random(num_points) + self.chunk_start
+        yy = y_delta * self.rng.random(num_points)
+        zz = y_delta * self.rng.random(num_points)
+
+        self.set_arrival_columns(xx, yy, zz, first_id=self.n_generated)
+
+    # Builds the columns from the raw point process coordinates (times, starting floors and destination floors)
+    def set_arrival_columns(self, xx, yy, zz, first_id=0):
+        starting_floors = np.floor(yy).astype(np.int64)
+        dest_floors = np.floor(zz).astype(np.int64)
+
+        # Not allowing pressing the same floor as the person is on
+        same_floor = dest_floors == starting_floors
+        dest_floors[same_floor] += np.where(dest_floors[same_floor] != 0, -1, 1)
+
+        # Arrivals are stored as columns; row i is the i-th person to spawn (the times are sorted, the floors are not
+        # reordered since they are independent of the times)
+        xx.sort()
+        self.spawn_times = xx
+        self.spawn_starting_floors = starting_floors
+        self.spawn_dest_floors = dest_floors
+        self.spawn_ids = np.arange(first_id, first_id + len(xx))
+
+    # Regenerates the arrivals with a new seed (same building, density and horizon) so one scheduler can be reused
+    # across episodes
+    def reseed(self, p_seed):
+        self.p_seed = p_seed
+        self.setup_distribution()
+
+    # Lookups do not change the scheduler, so in the default mode there is nothing to save (see Simulator.snapshot).
+    # In streaming mode the current chunk and RNG state are saved; columns are never modified in place, so keeping
+    # references is enough.
+    def snapshot(self):
+        if self.chunk_seconds is None:
+            return None
+        return (self.chunk_start, self.chunk_end, self.n_generated, self.spawn_times, self.spawn_starting_floors,
+                self.spawn_dest_floors, self.spawn_ids, self.rng.bit_generator.state)
+
+    def restore(self, token):
+        if self.chunk_seconds is None:
+            return
+        (self.chunk_start, self.chunk_end, self.n_generated, self.spawn_times, self.spawn_starting_floors,
+         self.spawn_dest_floors, self.spawn_ids, rng_state) = token
+        self.rng.bit_generator.state = rng_state
+
+    # Returns the row of the first arrival at/after timestamp (strictly after it if exclusive) in the current columns.
+    # In streaming mode, moves on to later chunks until one has such an arrival or the schedule ends.
+    def search_arrival_index(self, timestamp, exclusive=False):
+        side = "right" if exclusive else "left"
+        search_index = int(self.spawn_times.searchsorted(timestamp, side))
+        while search_index == len(self.spawn_times) and self.chunk_seconds is not None and \
+                self.chunk_end < self.seconds_to_schedule:
+            self.generate_next_chunk()
+            search_index = int(self.spawn_times.searchsorted(timestamp, side))
+        return search_index
 
     # Returns the absolute time and list of people (or likely one person) that will need to be spawned next
-    # relative to the current_timestamp
-    # Argument update_min_index_20_less only sets the min search index by 20 since there may be copying
-    def get_time_and_people_of_next_addition(self, current_timestamp, update_min_index_20_less=False):
+    # relative to the current_timestamp. Times may be asked for in any order (binary search over the sorted times),
+    # except that a streaming scheduler does not go back to chunks it has left (use snapshot/restore for that).
+    # Argument update_min_index_20_less is no longer needed and is ignored
+    # Argument exclusive skips people spawning exactly at current_timestamp (they are considered already spawned)
+    def get_time_and_people_of_next_addition(self, current_timestamp, update_min_index_20_less=False,
+                                             exclusive=False):
         # This is what needs to be accessed by the RL step function to determine when to call the ML/when to add
         # people to the system
 
         if current_timestamp > self.seconds_to_schedule:
             return -1.0, []
 
-        # Progress the search index till it reaches the time needed/requests
-        search_index = self.people_spawning_min_index
-        max_index = len(self.people_spawning)
-        while search_index < max_index and self.people_spawning[search_index]["time"] < current_timestamp:
-            search_index = search_index + 1
-
-        # If specified by update_min_index_20_less, increase the minimum searching index to help performance
-        if update_min_index_20_less:
-            self.people_spawning_min_index = max(0, search_index - 20)
-
-        if search_index == max_index:
-            if self.people_spawning[max_index]["time"] >= current_timestamp:
-                return self.people_spawning[max_index]["time"], \
-                       [Person(self.people_spawning[max_index]["starting_floor"],
-                               self.people_spawning[max_index]["dest_floor"])]
-            else:
-                return -1.0, []
-        else:
-            # The end of the array of times/people hasn't been reached
-            temp_people = []
-            new_timestamp = self.people_spawning[search_index]["time"]
-            # Add all the people that are at this same timestamp (probably just 1 person, but making sure)
-            while search_index <= max_index and abs(self.people_spawning[search_index]["time"] - new_timestamp) < .0001:
-                temp_people.append(Person(self.people_spawning[search_index]["starting_floor"],
-                                          self.people_spawning[search_index]["dest_floor"]))
-                search_index = search_index + 1
-            return new_timestamp, temp_people
+        search_index = self.search_arrival_index(current_timestamp, exclusive)
+        if search_index == len(self.spawn_times):
+            # Every scheduled person has already spawned
+            return -1.0, []
+
+        # Add all the people that are at this same timestamp (probably just 1 person, but making sure)
+        new_timestamp = float(self.spawn_times[search_index])
+        end_index = int(self.spawn_times.searchsorted(new_timestamp + .0001, "left"))
+        temp_people = [Person(starting_floor, dest_floor) for starting_floor, dest_floor in
+                       zip(self.spawn_starting_floors[search_index:end_index].tolist(),
+                           self.spawn_dest_floors[search_index:end_index].tolist())]
+        return new_timestamp, temp_people
+
+    # Returns the columns (times, starting floors, destination floors) of everyone spawning in
+    # [start_timestamp, end_timestamp), or in (start_timestamp, end_timestamp) if exclusive
+    def get_arrivals_between(self, start_timestamp, end_timestamp, exclusive=False):
+        if self.chunk_seconds is None or end_timestamp <= self.chunk_end:
+            start_index = int(self.spawn_times.searchsorted(start_timestamp, "right" if exclusive else "left"))
+            end_index = int(self.spawn_times.searchsorted(end_timestamp, "left"))
+            return (self.spawn_times[start_index:end_index], self.spawn_starting_floors[start_index:end_index],
+                    self.spawn_dest_floors[start_index:end_index])
+
+        # Streaming mode across chunk boundaries: collect each chunk's part, generating chunks as needed
+        parts = []
+        while True:
+            parts.append(self.get_arrivals_between(start_timestamp, min(end_timestamp, self.chunk_end), exclusive))
+            if end_timestamp <= self.chunk_end or self.chunk_end >= self.seconds_to_schedule:
+                break
+            self.generate_next_chunk()
+        return tuple(np.concatenate(columns) for columns in zip(*parts))
 
     # Triggers button presses on floors by spawning people in
     def spawn_people(self, timestamp, people):
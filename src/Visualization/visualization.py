@@ -2,19 +2,29 @@
 Author: Owen Barbour
 """
 
-import pyglet as pyglet
 import time
-from pyglet import gl
 from src.building import Building
 from src.elevator import Elevator
 from src.ElevatorState import ElevatorState
 
+# pyglet is imported by the first Visualization rather than at module import: importing pyglet.gl opens the display
+# (pyglet's shadow window), which fails on headless machines
+pyglet = None
+gl = None
+
+
+def import_pyglet():
+    global pyglet, gl
+    if pyglet is None:
+        import pyglet
+        from pyglet import gl
+
 
 class Visualization:
     """
     Graphics/visualization class.
     """
-    pyglet_window = pyglet.window.Window(height=700, width=675, caption='Simulation', resizable=False)  # width=1200
+    pyglet_window = None  # created by the first Visualization and shared by later ones
     color_pairs = (120, 0, 0, 100) * int(8 / 2)
     color_elevator_shaft_even = (0, 115, 230, 50) * 4
     color_elevator_even = (0, 115, 230, 100) * 4
@@ -33,6 +43,11 @@ class Visualization:
         """
         Creates the pyglet visualization components for seeing elevator movements
         """
+        import_pyglet()
+        if Visualization.pyglet_window is None:
+            Visualization.pyglet_window = pyglet.window.Window(height=700, width=675, caption='Simulation',
+                                                               resizable=False)  # width=1200
+
         # Property init
         self.building = building
         self.n_floors = building.n_floors
@@ -63,6 +78,16 @@ class Visualization:
         # Determine elevator/shaft coordinates based on above parameters
         self.elevator_component_positions()
 
+        # Batches are built once: the floor lines and shafts never change, and on_draw only updates the vertex lists
+        # and labels of the elevators and floors whose state changed since the last frame
+        self.static_batch = pyglet.graphics.Batch()
+        self.elevators_batch = pyglet.graphics.Batch()
+        self.floor_batch = pyglet.graphics.Batch()
+        self.draw_elevator_floors(self.static_batch)
+        self.draw_elevator_shafts(self.static_batch)
+        self.create_elevator_components()
+        self.create_floor_components()
+
         # Pyglet shader and function init
         pyglet.gl.glEnable(pyglet.gl.GL_BLEND)
         pyglet.gl.glBlendFunc(pyglet.gl.GL_SRC_ALPHA, pyglet.gl.GL_ONE_MINUS_SRC_ALPHA)
@@ -91,17 +116,22 @@ class Visualization:
         # self.label.draw()
         # self.quad.draw(pyglet.gl.GL_QUADS)
         # self.quad2.draw(pyglet.gl.GL_QUADS)
-        elevator_floors_batch = self.draw_elevator_floors()
-        elevator_shafts_batch = self.draw_elevator_shafts()
-        elevators_batch = self.draw_elevators()
-        floor_batch = self.draw_floor_information()
-        elevator_floors_batch.draw()
-        elevator_shafts_batch.draw()
-        elevators_batch.draw()
-        floor_batch.draw()
+        self.update_elevators()
+        self.update_floor_information()
+        self.static_batch.draw()
+        self.elevators_batch.draw()
+        self.floor_batch.draw()
 
         self.pyglet_window.flip()
 
+    def render(self):
+        """
+        Processes window events and redraws the window with the current state of the building.
+        """
+        pyglet.clock.tick()
+        self.pyglet_window.dispatch_events()
+        self.pyglet_window.dispatch_event("on_draw")
+
     # Default implementation (not used; resizing currently turned off)
     def on_resize(self, width, height):
         pyglet.gl.glViewport(0, 0, width, height)
@@ -146,8 +176,7 @@ class Visualization:
             self.pos_elevator_shafts.append((min_elev_x, min_y, max_elev_x, max_y))
             self.pos_elevators.append((min_elev_x, min_y, max_elev_x, min_y + elev_height_px))
 
-    def draw_elevator_floors(self):
-        batch = pyglet.graphics.Batch()
+    def draw_elevator_floors(self, batch):
         y_range = self.elev_section_max_y - self.elev_section_min_y
         y_floor_dist = y_range / self.n_floors
         for i in range(0, self.n_floors):
@@ -155,10 +184,8 @@ class Visualization:
             # self.canvas.create_line(min_x, floor_y, max_x, floor_y)
             batch.add(2, pyglet.gl.GL_LINES, None, ('v2f', (self.elev_section_min_x, floor_y, self.elev_section_max_x,
                                                             floor_y)), ('c3B', (0, 0, 0, 0, 0, 0)))
-        return batch
 
-    def draw_elevator_shafts(self):
-        batch = pyglet.graphics.Batch()
+    def draw_elevator_shafts(self, batch):
         for i in range(0, len(self.pos_elevator_shafts)):
             min_elev_x = self.pos_elevator_shafts[i][0]
             min_y = self.pos_elevator_shafts[i][1]
@@ -174,50 +201,66 @@ class Visualization:
                 batch.add(4, pyglet.gl.GL_QUADS, None,
                           ('v2f', (min_elev_x, min_y, max_elev_x, min_y, max_elev_x, max_y, min_elev_x, max_y)),
                           ('c4B', self.color_elevator_shaft_odd))
-        return batch
 
-    def draw_elevators(self):
-        batch = pyglet.graphics.Batch()
+    # Adds a car quad, a 4-sided outline and a passenger label per elevator to elevators_batch; update_elevators moves
+    # and recolors them
+    def create_elevator_components(self):
+        self.elevator_quads = []
+        self.elevator_outlines = []
+        self.elevator_labels = []
+        for i in range(0, len(self.pos_elevators)):
+            color = self.color_elevator_even if i % 2 == 0 else self.color_elevator_odd
+            self.elevator_quads.append(self.elevators_batch.add(4, pyglet.gl.GL_QUADS, None, ('v2f', (0.0,) * 8),
+                                                                ('c4B', color)))
+            self.elevator_outlines.append(self.elevators_batch.add(16, pyglet.gl.GL_QUADS, None, ('v2f', (0.0,) * 32),
+                                                                   ('c3B', self.color_gray * 16)))
+            self.elevator_labels.append(pyglet.text.Label("0", font_name='Times New Roman', font_size=12, x=0, y=0,
+                                                          anchor_x='center', anchor_y='center',
+                                                          batch=self.elevators_batch))
+        # Position, state and rider count currently drawn for each elevator (None = not drawn yet)
+        self.drawn_elevator_positions = [None] * len(self.pos_elevators)
+        self.drawn_elevator_states = [None] * len(self.pos_elevators)
+        self.drawn_elevator_riders = [None] * len(self.pos_elevators)
+
+    def update_elevators(self):
         border_size = 3
+        y_range = self.elev_section_max_y - self.elev_section_min_y
+        shaft_height_meters = self.n_floors * self.building.floor_dist
 
         for i in range(0, len(self.pos_elevators)):
-            y_range = self.elev_section_max_y - self.elev_section_min_y
-            shaft_height_meters = self.n_floors * self.building.floor_dist
-            elev_y_offset_px = y_range / shaft_height_meters * self.building.elevators[i].position
-
-            elev_min_x = self.pos_elevators[i][0]
-            elev_min_y = self.pos_elevators[i][1] + elev_y_offset_px
-            elev_max_x = self.pos_elevators[i][2]
-            elev_max_y = self.pos_elevators[i][3] + elev_y_offset_px
-            if i % 2 == 0:
-                batch.add(4, pyglet.gl.GL_QUADS, None,
-                          ('v2f', (elev_min_x, elev_min_y, elev_max_x, elev_min_y, elev_max_x, elev_max_y, elev_min_x,
-                                   elev_max_y)), ('c4B', self.color_elevator_even))
-                '''batch.add(4, pyglet.gl.GL_QUADS, None,
-                          ('v2f', (min_x+border_size, min_y+border_size, max_x-border_size, min_y+border_size, 
-                          max_x-border_size, max_y-border_size, min_x+border_size, max_y-border_size)),
-                          ('c4B', self.color_elevator_even_2))'''
-            else:
-                batch.add(4, pyglet.gl.GL_QUADS, None,
-                          ('v2f', (elev_min_x, elev_min_y, elev_max_x, elev_min_y, elev_max_x, elev_max_y, elev_min_x,
-                                   elev_max_y)), ('c4B', self.color_elevator_odd))
-            self.draw_elevator_passengers(batch, self.building.elevators[i], elev_min_x, elev_min_y, elev_max_x,
-                                          elev_max_y)
-            self.draw_elevator_outline(batch, self.building.elevators[i], border_size, elev_min_x, elev_min_y,
-                                       elev_max_x, elev_max_y)
-        return batch
+            elevator = self.building.elevators[i]
+            if elevator.position != self.drawn_elevator_positions[i]:
+                self.drawn_elevator_positions[i] = elevator.position
+                elev_y_offset_px = y_range / shaft_height_meters * elevator.position
+
+                elev_min_x = self.pos_elevators[i][0]
+                elev_min_y = self.pos_elevators[i][1] + elev_y_offset_px
+                elev_max_x = self.pos_elevators[i][2]
+                elev_max_y = self.pos_elevators[i][3] + elev_y_offset_px
+                self.elevator_quads[i].vertices[:] = (elev_min_x, elev_min_y, elev_max_x, elev_min_y, elev_max_x,
+                                                      elev_max_y, elev_min_x, elev_max_y)
+                self.elevator_outlines[i].vertices[:] = self.elevator_outline_vertices(border_size, elev_min_x,
+                                                                                       elev_min_y, elev_max_x,
+                                                                                       elev_max_y)
+                self.move_elevator_passengers(self.elevator_labels[i], elev_min_x, elev_min_y, elev_max_x, elev_max_y)
+            if elevator.get_num_riders() != self.drawn_elevator_riders[i]:
+                self.drawn_elevator_riders[i] = elevator.get_num_riders()
+                self.elevator_labels[i].text = str(elevator.get_num_riders())
+            if elevator.state != self.drawn_elevator_states[i]:
+                self.drawn_elevator_states[i] = elevator.state
+                self.draw_elevator_outline(self.elevator_outlines[i], elevator)
 
     # Displays the number of passengers in an elevator on the center of the elevator
     @staticmethod
-    def draw_elevator_passengers(batch, elevator, elev_min_x, elev_min_y, elev_max_x, elev_max_y):
-        pyglet.text.Label(str(len(elevator.riders)), font_name='Times New Roman', font_size=12,
-                          x=((elev_min_x + elev_max_x) / 2), y=((elev_min_y + elev_max_y) / 2),
-                          anchor_x='center', anchor_y='center', batch=batch)
+    def move_elevator_passengers(label, elev_min_x, elev_min_y, elev_max_x, elev_max_y):
+        label.begin_update()
+        label.x = (elev_min_x + elev_max_x) / 2
+        label.y = (elev_min_y + elev_max_y) / 2
+        label.end_update()
 
-    # Elevator outline is non-transparent green/red indicating UP and DOWN ElevatorState
-    # No outline for NO_ACTION or LOADING_UNLOADING ElevatorState
-    # Will have to use shaders, or draw 1-4 polygons
-    def draw_elevator_outline(self, batch, elevator, border_size, elev_min_x, elev_min_y, elev_max_x, elev_max_y):
+    # Vertices of the bottom, right, top and left sides of an elevator outline, one quad each
+    @staticmethod
+    def elevator_outline_vertices(border_size, elev_min_x, elev_min_y, elev_max_x, elev_max_y):
         rect_bottom = (elev_min_x, elev_min_y, elev_max_x, elev_min_y, elev_max_x, elev_min_y + border_size,
                        elev_min_x, elev_min_y + border_size)
         rect_right = (elev_max_x - border_size, elev_min_y, elev_max_x, elev_min_y, elev_max_x, elev_max_y,
@@ -226,28 +269,27 @@ class Visualization:
                     elev_min_x, elev_max_y)
         rect_left = (elev_min_x, elev_min_y, elev_min_x + border_size, elev_min_y, elev_min_x + border_size, elev_max_y,
                      elev_min_x, elev_max_y)
+        return rect_bottom + rect_right + rect_top + rect_left
 
+    # Elevator outline is non-transparent green/red indicating UP and DOWN ElevatorState
+    # Gray for NO_ACTION and yellow for LOADING_UNLOADING ElevatorState
+    def draw_elevator_outline(self, outline, elevator):
         if elevator.state == ElevatorState.NO_ACTION:
-            self.add_rect_solid_outline(batch, rect_bottom, rect_right, rect_top, rect_left, self.color_gray * 4)
+            outline.colors[:] = self.color_gray * 16
         elif elevator.state == ElevatorState.LOADING_UNLOADING:
-            self.add_rect_solid_outline(batch, rect_bottom, rect_right, rect_top, rect_left, self.color_yellow * 4)
+            outline.colors[:] = self.color_yellow * 16
         elif elevator.state == ElevatorState.UP:
-            self.add_rect_solid_outline(batch, rect_bottom, rect_right, rect_top, rect_left, self.color_green * 4)
+            outline.colors[:] = self.color_green * 16
         elif elevator.state == ElevatorState.DOWN:
-            self.add_rect_solid_outline(batch, rect_bottom, rect_right, rect_top, rect_left, self.color_red * 4)
-
-    @staticmethod
-    def add_rect_solid_outline(batch, rect_bottom, rect_right, rect_top, rect_left, color_rgb):
-        batch.add(4, pyglet.gl.GL_QUADS, None, ('v2f', rect_bottom), ('c3B', color_rgb))
-        batch.add(4, pyglet.gl.GL_QUADS, None, ('v2f', rect_right), ('c3B', color_rgb))
-        batch.add(4, pyglet.gl.GL_QUADS, None, ('v2f', rect_top), ('c3B', color_rgb))
-        batch.add(4, pyglet.gl.GL_QUADS, None, ('v2f', rect_left), ('c3B', color_rgb))
+            outline.colors[:] = self.color_red * 16
 
     # x coordinate region defined by floor_section_min_x/floor_section_max_x and y coordinate region defined by
     # elev_section_min_y/elev_section_max_y. The placement of the text (height) is determined by the tuples in
     # pos_elevators; the y-coor will be the middle of the 2nd and 4th element of the tuple for the floor.
-    def draw_floor_information(self):
-        batch = pyglet.graphics.Batch()
+    # Adds a waiting count label and up/down arrows per floor, plus the column headings, to floor_batch;
+    # update_floor_information changes them.
+    def create_floor_components(self):
+        batch = self.floor_batch
 
         # Column for up button pressed, down button pressed, and number of people waiting
         x_total_range = self.floor_section_max_x - self.floor_section_min_x
@@ -261,6 +303,12 @@ class Visualization:
         text_offset_y = 3
         label_offset_y = 35
 
+        self.floor_waiting_labels = []
+        self.up_arrows = []
+        self.down_arrows = []
+        self.up_arrow_vertices = []
+        self.down_arrow_vertices = []
+
         # For each floor, add the number each of the above described columns
         for i in range(0, self.n_floors):
             y_range = self.elev_section_max_y - self.elev_section_min_y
@@ -270,19 +318,21 @@ class Visualization:
             max_y_top_of_elev = self.pos_elevators[0][3]
             middle_y = (min_y_floor + max_y_top_of_elev) / 2 + i * y_floor_dist
 
-            pyglet.text.Label(str(len(self.building.floors[i].people_waiting)), font_name='Times New Roman',
-                              font_size=12, x=people_waiting_column_x, y=middle_y + text_offset_y, anchor_x='center',
-                              anchor_y='center', batch=batch, color=(0, 0, 0, 255))
-            if self.building.floors[i].up_pressed:
-                batch.add(3, pyglet.gl.GL_TRIANGLES, None,
-                          ('v2f', (up_button_column_x - arrow_offset_x, middle_y - arrow_offset_y,
-                                   up_button_column_x + arrow_offset_x, middle_y - arrow_offset_y,
-                                   up_button_column_x, middle_y + arrow_offset_y)), ('c3B', self.color_green * 3))
-            if self.building.floors[i].down_pressed:
-                batch.add(3, pyglet.gl.GL_TRIANGLES, None,
-                          ('v2f', (down_button_column_x + arrow_offset_x, middle_y + arrow_offset_y,
-                                   down_button_column_x - arrow_offset_x, middle_y + arrow_offset_y,
-                                   down_button_column_x, middle_y - arrow_offset_y)), ('c3B', self.color_red * 3))
+            self.floor_waiting_labels.append(pyglet.text.Label("0", font_name='Times New Roman', font_size=12,
+                                                               x=people_waiting_column_x, y=middle_y + text_offset_y,
+                                                               anchor_x='center', anchor_y='center', batch=batch,
+                                                               color=(0, 0, 0, 255)))
+            # An arrow is hidden by collapsing its vertices to (0, 0) while its button is not pressed
+            self.up_arrow_vertices.append((up_button_column_x - arrow_offset_x, middle_y - arrow_offset_y,
+                                           up_button_column_x + arrow_offset_x, middle_y - arrow_offset_y,
+                                           up_button_column_x, middle_y + arrow_offset_y))
+            self.down_arrow_vertices.append((down_button_column_x + arrow_offset_x, middle_y + arrow_offset_y,
+                                             down_button_column_x - arrow_offset_x, middle_y + arrow_offset_y,
+                                             down_button_column_x, middle_y - arrow_offset_y))
+            self.up_arrows.append(batch.add(3, pyglet.gl.GL_TRIANGLES, None, ('v2f', (0.0,) * 6),
+                                            ('c3B', self.color_green * 3)))
+            self.down_arrows.append(batch.add(3, pyglet.gl.GL_TRIANGLES, None, ('v2f', (0.0,) * 6),
+                                              ('c3B', self.color_red * 3)))
 
             # Add labels for the columns - WAITING, UP, DOWN
             if i == self.n_floors - 1:
@@ -296,7 +346,49 @@ class Visualization:
                                   y=middle_y + text_offset_y + label_offset_y, anchor_x='center', anchor_y='center',
                                   batch=batch, color=(0, 0, 0, 255))
 
-        return batch
+        # Waiting count and button states currently drawn for each floor
+        self.drawn_waiting_counts = [0] * self.n_floors
+        self.drawn_up_pressed = [False] * self.n_floors
+        self.drawn_down_pressed = [False] * self.n_floors
+
+    def update_floor_information(self):
+        waiting_counts = self.building.people_waiting_counts.tolist()
+        for i in range(0, self.n_floors):
+            floor = self.building.floors[i]
+            if waiting_counts[i] != self.drawn_waiting_counts[i]:
+                self.drawn_waiting_counts[i] = waiting_counts[i]
+                self.floor_waiting_labels[i].text = str(waiting_counts[i])
+            if floor.up_pressed != self.drawn_up_pressed[i]:
+                self.drawn_up_pressed[i] = floor.up_pressed
+                self.up_arrows[i].vertices[:] = self.up_arrow_vertices[i] if floor.up_pressed else (0.0,) * 6
+            if floor.down_pressed != self.drawn_down_pressed[i]:
+                self.drawn_down_pressed[i] = floor.down_pressed
+                self.down_arrows[i].vertices[:] = self.down_arrow_vertices[i] if floor.down_pressed else (0.0,) * 6
+
+
+class HeadlessVisualization:
+    """
+    No-op stand-in for Visualization, for running the same loop without pyglet or a display (rollout workers, servers).
+    """
+
+    def __init__(self, building):
+        self.building = building
+        self.alive = 1
+
+    def render(self):
+        pass
+
+    def on_draw(self):
+        pass
+
+
+def create_visualization(building, headless=False):
+    """
+    Returns -- a Visualization of building, or a HeadlessVisualization if headless
+    """
+    if headless:
+        return HeadlessVisualization(building)
+    return Visualization(building)
 
 
 def visualization_test_main():
@@ -313,10 +405,7 @@ def visualization_test_main():
         print("Running loop")
         time.sleep(7)
 
-        # These three lines are needed
-        pyglet.clock.tick()
-        vis.pyglet_window.dispatch_events()
-        vis.pyglet_window.dispatch_event("on_draw")
+        vis.render()
 
         building.elevators[0].position += 3
         building.elevators[2].position += 2
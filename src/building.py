@@ -7,13 +7,15 @@ from src.Person import Person
 from src.floor import Floor
 from math import floor as math_floor
 
+import numpy as np
+
 
 class Building:
     """
     Building class.
     """
 
-    def __init__(self, name, elevators, n_floors, floor_dist=4.5, elev_height=2.5):
+    def __init__(self, name, elevators, n_floors, floor_dist=4.5, elev_height=2.5, board_at_last_stop=False):
         """
         Creates a building object.
 
@@ -22,6 +24,9 @@ class Building:
         elevators -- a list of elevators in this building.
         n_floors -- number fo floors in building
         floor_dist -- distance between floors (meters)
+        board_at_last_stop -- with several elevators, everyone waiting (up to capacity) boards an elevator at its last
+                              queued stop, as with a single elevator; needed by rl_step_func_multi, which only picks
+                              an elevator's next floor once it has loaded
         """
 
         self.name = name
@@ -31,6 +36,33 @@ class Building:
         self.elev_height = elev_height
         self.floors = [Floor(floor_num) for floor_num in range(0, n_floors)]  # floors is zero indexed
         self.last_floor_button_pressed = 0  # timestamp of when the last person pressed a floor button
+        self.delivered_wait_times = []  # Person wait time of everyone who got off at their destination, in order
+        self.clock = 0.0  # seconds advanced by the step function; Person timestamps are on this clock
+
+        # Running counts kept up to date by add_waiting_person and Elevator.load_unload (call update_people_counts
+        # after adding or removing people with Floor/Elevator methods directly)
+        self.elevator_indexes = {elevator: elevator_index for elevator_index, elevator in enumerate(elevators)}
+        self.rider_counts = [0] * len(elevators)  # len(elevator.riders) per elevator
+        self.n_people_in_system = 0
+        self.sum_spawn_times = 0.0  # sum of Person.spawn_time over everyone in the system
+
+        # Observation vector (see Simulator.get_state), updated in place as people spawn, board and alight and as
+        # buttons are pressed: riders per destination floor for each elevator, then the up/down buttons of each
+        # floor, then the people waiting on each floor
+        self.button_observation_offset = len(elevators) * n_floors
+        self.waiting_observation_offset = self.button_observation_offset + 2 * n_floors
+        self.observation = np.zeros(self.waiting_observation_offset + n_floors, dtype=np.int64)
+        for floor in self.floors:
+            floor.observation = self.observation
+            floor.observation_index = self.button_observation_offset + 2 * floor.floor_number
+        self.board_at_last_stop = board_at_last_stop
+        self.travel_time_matrices = dict()  # car type -> floor-to-floor travel times (see get_travel_time_matrix)
+
+        # EventQueue left pending by rl_step_func_multi, reused by the next call if it starts at event_queue_time with
+        # the same person scheduler (restore drops it)
+        self.event_queue = None
+        self.event_queue_time = None
+        self.event_queue_scheduler = None
 
     def get_floor_by_position(self, position):
         floor_idx = math_floor(position / self.floor_dist + .01)
@@ -39,6 +71,39 @@ class Building:
     def get_position_of_floor(self, floor):
         return floor.floor_number * self.floor_dist
 
+    def get_travel_time_matrix(self, elevator):
+        """
+        Returns the (read-only) n_floors x n_floors matrix of seconds a car like elevator takes to go from rest at floor
+        i to rest at floor j, without stopping or loading. Computed once per car type (max_velocity, max_acc,
+        max_dec) and floor_dist, then cached.
+        """
+        key = (elevator.max_velocity, abs(elevator.max_acc), abs(elevator.max_dec), self.floor_dist)
+        matrix = self.travel_time_matrices.get(key)
+        if matrix is None:
+            floor_nums = np.arange(0, self.n_floors)
+            times = self.calc_stationary_travel_times(floor_nums * self.floor_dist, *key[:3])
+            matrix = times[np.abs(floor_nums[:, None] - floor_nums[None, :])]
+            matrix.setflags(write=False)
+            self.travel_time_matrices[key] = matrix
+        return matrix
+
+    def get_travel_time(self, elevator, from_floor_num, to_floor_num):
+        return float(self.get_travel_time_matrix(elevator)[from_floor_num, to_floor_num])
+
+    @staticmethod
+    def calc_stationary_travel_times(distances, max_velocity, acc, dec):
+        """
+        Seconds to cover each of distances starting and ending at rest, with the kinematics of
+        Elevator.calc_time_to_reach_position: speed up at acc, cruise at max_velocity if the distance allows it, slow
+        down at dec.
+        """
+        dist_to_max_and_stop = max_velocity * max_velocity / 2 / acc + max_velocity * max_velocity / 2 / dec
+        cruise_times = max_velocity / acc + (distances - dist_to_max_and_stop) / max_velocity + max_velocity / dec
+        # Won't reach max_velocity: speed up for t1 then slow down (the quadratic of abbr_velocity_calc_dist_time)
+        time_speeding_up = np.sqrt(distances / (acc / 2 + acc * acc / 2 / dec))
+        abbr_times = time_speeding_up + acc * time_speeding_up / dec
+        return np.where(distances >= dist_to_max_and_stop, cruise_times, abbr_times)
+
     def get_n_elevators(self):
         """
         Get the total number of elevators.
@@ -52,21 +117,85 @@ class Building:
         # TODO
         pass
 
+    @property
+    def people_waiting_counts(self):
+        """
+        len(floor.people_waiting) per floor (a view of the observation).
+        """
+        return self.observation[self.waiting_observation_offset:]
+
+    def snapshot(self):
+        """
+        Returns a flat tuple of the state of every floor and elevator (see Simulator.snapshot).
+        """
+        return self.last_floor_button_pressed, self.clock, len(self.delivered_wait_times), self.observation.copy(), \
+            tuple(self.rider_counts), self.n_people_in_system, self.sum_spawn_times, self.board_at_last_stop, \
+            tuple(floor.snapshot() for floor in self.floors), tuple(elevator.snapshot() for elevator in self.elevators)
+
+    def restore(self, token):
+        """
+        Puts the building back into the state captured by snapshot.
+        """
+        self.last_floor_button_pressed, self.clock, n_delivered, observation, rider_counts, \
+            self.n_people_in_system, self.sum_spawn_times, self.board_at_last_stop, floor_tokens, elevator_tokens = token
+        self.observation[:] = observation
+        self.rider_counts[:] = rider_counts
+        self.event_queue = None
+        del self.delivered_wait_times[n_delivered:]  # only ever appended to, so truncating restores it
+        for floor, floor_token in zip(self.floors, floor_tokens):
+            floor.restore(floor_token)
+        for elevator, elevator_token in zip(self.elevators, elevator_tokens):
+            elevator.restore(elevator_token, self)
+
     # Adds people to people waiting on floor and presses the buttons
     def add_waiting_person(self, person):
         # (floors are zero indexed)
-        self.floors[person.floor].people_waiting.append(person)
+        person.spawn_time = self.clock
+        self.floors[person.floor].add_person(person)
+        self.observation[self.waiting_observation_offset + person.floor] += 1
+        self.n_people_in_system += 1
+        self.sum_spawn_times += person.spawn_time
         if person.floor < person.destination:
             self.floors[person.floor].up_pressed = True
         else:
             self.floors[person.floor].down_pressed = True
 
+    # Updates the counts after Elevator.load_unload moved the people in boarded from floor floor_num onto elevator
+    def people_boarded(self, floor_num, elevator, boarded):
+        elevator_index = self.elevator_indexes[elevator]
+        self.observation[self.waiting_observation_offset + floor_num] -= len(boarded)
+        self.rider_counts[elevator_index] += len(boarded)
+        for person in boarded:
+            self.observation[elevator_index * self.n_floors + person.destination] += 1
+
+    # Updates the counts after Elevator.load_unload let person off elevator at its destination
+    def person_alighted(self, elevator, person):
+        elevator_index = self.elevator_indexes[elevator]
+        self.rider_counts[elevator_index] -= 1
+        self.observation[elevator_index * self.n_floors + person.destination] -= 1
+        self.n_people_in_system -= 1
+        if self.n_people_in_system == 0:
+            self.sum_spawn_times = 0.0  # no rounding error is carried over once the building is empty
+        else:
+            self.sum_spawn_times -= person.spawn_time
+
+    # Recomputes the counts from the floors and elevators
+    def update_people_counts(self):
+        self.people_waiting_counts[:] = [floor.get_num_people_waiting() for floor in self.floors]
+        self.rider_counts[:] = [elevator.get_num_riders() for elevator in self.elevators]
+        self.observation[:self.button_observation_offset] = 0
+        for elevator_index, elevator in enumerate(self.elevators):
+            for rider in elevator.riders:
+                self.observation[elevator_index * self.n_floors + rider.destination] += 1
+        self.n_people_in_system = int(sum(self.people_waiting_counts)) + sum(self.rider_counts)
+        self.sum_spawn_times = sum(person.spawn_time for floor in self.floors for person in floor.people_waiting) + \
+            sum(person.spawn_time for elevator in self.elevators for person in elevator.riders)
+
     def get_total_people_in_system(self):
-        total = 0
-        for floor in self.floors:
-            if floor.people_waiting is not None:
-                total += len(floor.people_waiting)
-        for elevator in self.elevators:
-            if elevator.riders is not None:
-                total += len(elevator.riders)
-        return total
+        return self.n_people_in_system
+
+    def get_sum_wait_times(self):
+        """
+        Returns the sum of the wait times of everyone in the system (see Person.get_wait_time).
+        """
+        return self.n_people_in_system * self.clock - self.sum_spawn_times
@@ -0,0 +1,391 @@
+"""
+dispatch.py
+Classical dispatching baselines for multi-elevator buildings: directional collective control, LOOK (SCAN), nearest car
+and ETA minimizing dispatch. Each is a policy for rl_step_func_multi that reads the hall calls (Floor.up_pressed and
+down_pressed) and the car calls (destinations of the riders) and gives each elevator its next stop, which
+rl_step_func_multi appends to Elevator.queued_floors.
+
+Example (a simulated month in one episode):
+    config = RolloutConfig(n_elevators=4, episode_seconds=30 * 24 * 3600, policy=CollectiveControlPolicy(),
+                           rl_step_func=rl_step_func_multi)
+    result = EpisodeRunner(config).run_episode(0)
+
+Example (a simulated month as 30 one-day episodes, one per worker process at a time):
+    config = RolloutConfig(n_elevators=4, episode_seconds=24 * 3600, policy=CollectiveControlPolicy(),
+                           rl_step_func=rl_step_func_multi)
+    with RolloutPool(config) as pool:
+        results = list(pool.run(30))
+"""
+from abc import ABC, abstractmethod
+
+from src.ElevatorState import ElevatorState
+
+UP = 1
+DOWN = -1
+
+
+class DispatchPolicy(ABC):
+    """
+    DispatchPolicy class.
+    Base class of the dispatching policies. Instances are called like a RolloutConfig policy, (sim, state_list,
+    step_num) -> action, and pickle into rollout and sweep workers. The action list and the per-floor and per-elevator
+    bookkeeping are allocated once per building (reset) and reused at every decision.
+    Subclasses implement dispatch(building), which sends elevators with send.
+    """
+
+    # Per-episode state, left out of the sweep cache key (sweep.describe_value)
+    runtime_attributes = ("building", "action", "directions", "claimed", "buttons", "any_hall_call", "hall_calls")
+
+    def __init__(self):
+        self.building = None
+        self.action = []
+        self.directions = []
+        self.claimed = []
+        self.buttons = None  # view of the hall buttons in building.observation
+        self.any_hall_call = False
+        self.hall_calls = []
+
+    def reset(self, building):
+        """
+        Allocates the bookkeeping for building and sets every elevator's direction to UP. Called on the first step of
+        each episode.
+        """
+        self.building = building
+        self.action = [None] * len(building.elevators)
+        self.directions = [UP] * len(building.elevators)  # direction of the last move of each elevator
+        self.claimed = [False] * building.n_floors  # floors an elevator is already headed to
+        self.buttons = building.observation[building.button_observation_offset:
+                                            building.button_observation_offset + 2 * building.n_floors]
+        self.any_hall_call = False
+        self.hall_calls = [0] * building.n_floors  # first update_hall_calls() entries: floors with a hall call
+
+    def __call__(self, sim, state_list, step_num):
+        building = sim.building
+        if step_num == 0 or building is not self.building:
+            self.reset(building)
+        action = self.action
+        claimed = self.claimed
+        self.any_hall_call = bool(self.buttons.any())
+        for floor_num in range(0, building.n_floors):
+            claimed[floor_num] = False
+        for elevator_index in range(0, len(action)):
+            action[elevator_index] = None
+            for floor in building.elevators[elevator_index].queued_floors:
+                claimed[floor.floor_number] = True
+        self.dispatch(building)
+        return action
+
+    @abstractmethod
+    def dispatch(self, building):
+        """
+        Sets the action of the elevators to move (with send), given the claimed floors and any_hall_call.
+        """
+
+    def send(self, elevator_index, floor_num, from_floor_num=None):
+        """
+        Makes floor_num the action of the elevator and claims it. from_floor_num -- floor an idle elevator is on (to
+        update its direction)
+        """
+        self.action[elevator_index] = floor_num
+        self.claimed[floor_num] = True
+        if from_floor_num is not None and floor_num != from_floor_num:
+            self.directions[elevator_index] = UP if floor_num > from_floor_num else DOWN
+
+    @staticmethod
+    def is_idle(elevator):
+        return elevator.state == ElevatorState.NO_ACTION and len(elevator.queued_floors) == 0
+
+    @staticmethod
+    def current_floor_num(elevator, building):
+        return int(round(elevator.position / building.floor_dist))
+
+    @staticmethod
+    def has_hall_call(floor):
+        return floor.up_pressed or floor.down_pressed
+
+    def update_hall_calls(self, building):
+        """
+        Puts the floors with a hall call (claimed or not), from the bottom up, at the start of hall_calls.
+        Returns -- the number of floors with a hall call
+        """
+        n_hall_calls = 0
+        if self.any_hall_call:
+            hall_calls = self.hall_calls
+            for floor in building.floors:
+                if floor.up_pressed or floor.down_pressed:
+                    hall_calls[n_hall_calls] = floor.floor_number
+                    n_hall_calls += 1
+        return n_hall_calls
+
+    def nearest_car_call(self, elevator_index, elevator, floor_num):
+        """
+        Returns the nearest destination of the riders in the elevator's direction, or else the nearest one behind it.
+        """
+        direction = self.directions[elevator_index]
+        nearest_ahead = None
+        nearest_behind = None
+        for destination in elevator.riders_by_destination:
+            distance = (destination - floor_num) * direction
+            if distance > 0:
+                if nearest_ahead is None or distance < (nearest_ahead - floor_num) * direction:
+                    nearest_ahead = destination
+            elif nearest_behind is None or -distance < (floor_num - nearest_behind) * direction:
+                nearest_behind = destination
+        return nearest_ahead if nearest_ahead is not None else nearest_behind
+
+
+class SweepPolicy(DispatchPolicy):
+    """
+    SweepPolicy class.
+    Each idle elevator keeps going in its direction while there is a call ahead of it and otherwise reverses. A call
+    on the floor an idle elevator is on is answered first (rl_step_func_multi then loads the people there). Full
+    elevators only go by their car calls.
+    stop_for_any_call -- stop at every hall call ahead (LOOK); otherwise (collective control) only at hall calls in the
+    direction of travel, going on to the farthest call the other way when no stop is left ahead
+    """
+
+    stop_for_any_call = True
+
+    def dispatch(self, building):
+        floors = building.floors
+        n_hall_calls = self.update_hall_calls(building)
+        for elevator_index, elevator in enumerate(building.elevators):
+            if not self.is_idle(elevator) or (elevator.n_riders == 0 and n_hall_calls == 0):
+                continue
+            floor_num = self.current_floor_num(elevator, building)
+            has_room = elevator.n_riders < elevator.max_riders
+            if has_room and self.has_hall_call(floors[floor_num]):
+                self.send(elevator_index, floor_num)
+                continue
+            direction = self.directions[elevator_index]
+            stop = self.next_stop(building, elevator, floor_num, direction, has_room, n_hall_calls)
+            if stop is None:
+                stop = self.next_stop(building, elevator, floor_num, -direction, has_room, n_hall_calls)
+            if stop is not None:
+                self.send(elevator_index, stop, floor_num)
+
+    def next_stop(self, building, elevator, floor_num, direction, has_room=True, n_hall_calls=None):
+        """
+        Returns the next stop of the elevator leaving floor_num in direction, or None if there is no call that way:
+        the nearest car call or unclaimed hall call it stops for, else the farthest unclaimed hall call the other way.
+        has_room -- False if the elevator is full, so that it only goes by its car calls
+        n_hall_calls -- update_hall_calls() of this decision (None = call it)
+        """
+        nearest_stop = None
+        for destination in elevator.riders_by_destination:
+            distance = (destination - floor_num) * direction
+            if distance > 0 and (nearest_stop is None or distance < (nearest_stop - floor_num) * direction):
+                nearest_stop = destination
+        if not has_room:
+            return nearest_stop
+
+        if n_hall_calls is None:
+            n_hall_calls = self.update_hall_calls(building)
+        floors = building.floors
+        hall_calls = self.hall_calls
+        claimed = self.claimed
+        farthest_other_way = None
+        for call_index in range(0, n_hall_calls):
+            stop = hall_calls[call_index]
+            distance = (stop - floor_num) * direction
+            if distance <= 0 or claimed[stop] or \
+                    (nearest_stop is not None and distance >= (nearest_stop - floor_num) * direction):
+                continue
+            floor = floors[stop]
+            call_this_way = floor.up_pressed if direction == UP else floor.down_pressed
+            call_other_way = floor.down_pressed if direction == UP else floor.up_pressed
+            if call_this_way or (call_other_way and self.stop_for_any_call):
+                nearest_stop = stop
+            elif call_other_way and \
+                    (farthest_other_way is None or distance > (farthest_other_way - floor_num) * direction):
+                farthest_other_way = stop
+        return nearest_stop if nearest_stop is not None else farthest_other_way
+
+
+class CollectiveControlPolicy(SweepPolicy):
+    """
+    CollectiveControlPolicy class.
+    Directional collective control: on the way up an elevator stops for its riders and for up calls, on the way down
+    for its riders and for down calls (see SweepPolicy).
+    """
+
+    stop_for_any_call = False
+
+
+class LookPolicy(SweepPolicy):
+    """
+    LookPolicy class.
+    LOOK (SCAN that reverses at the last call instead of the end of the shaft): an elevator stops at every call ahead
+    of it, whichever way the people there are going (see SweepPolicy).
+    """
+
+    stop_for_any_call = True
+
+
+class NearestCarPolicy(DispatchPolicy):
+    """
+    NearestCarPolicy class.
+    Idle elevators with riders take them to their nearest destination (see nearest_car_call). Then each unclaimed hall
+    call goes to the closest empty idle elevator, closest pairs first.
+    """
+
+    def dispatch(self, building):
+        elevators = building.elevators
+        claimed = self.claimed
+        action = self.action
+        for elevator_index, elevator in enumerate(elevators):
+            if self.is_idle(elevator) and elevator.n_riders > 0:
+                floor_num = self.current_floor_num(elevator, building)
+                self.send(elevator_index, self.nearest_car_call(elevator_index, elevator, floor_num), floor_num)
+
+        hall_calls = self.hall_calls
+        n_hall_calls = self.update_hall_calls(building)
+        while n_hall_calls > 0:
+            best_distance = None
+            best_elevator_index = None
+            best_stop = None
+            for elevator_index, elevator in enumerate(elevators):
+                if action[elevator_index] is not None or not self.is_idle(elevator):
+                    continue
+                floor_num = self.current_floor_num(elevator, building)
+                for call_index in range(0, n_hall_calls):
+                    stop = hall_calls[call_index]
+                    if claimed[stop]:
+                        continue
+                    distance = abs(stop - floor_num)
+                    if best_distance is None or distance < best_distance:
+                        best_distance = distance
+                        best_elevator_index = elevator_index
+                        best_stop = stop
+            if best_distance is None:
+                return
+            self.send(best_elevator_index, best_stop,
+                      self.current_floor_num(elevators[best_elevator_index], building))
+
+
+class EtaPolicy(DispatchPolicy):
+    """
+    EtaPolicy class.
+    Idle elevators with riders take them to their nearest destination (see nearest_car_call). Then each unclaimed hall
+    call goes to the elevator with room that can get there first, earliest pairs first. An elevator gets there after
+    its queued stops (Elevator.estimate_free_time) and after delivering the riders it has, and will pick up at its last
+    queued stop, to their destinations (see ready_time). An idle elevator is sent to the call; a busy one only reserves
+    it, so the call is reassigned at the next decision.
+    """
+
+    runtime_attributes = DispatchPolicy.runtime_attributes + ("travel_times", "ready_times", "ready_floors",
+                                                              "floor_marks", "mark")
+
+    def __init__(self):
+        super().__init__()
+        self.travel_times = []
+        self.ready_times = []
+        self.ready_floors = []
+        self.floor_marks = []
+        self.mark = 0
+
+    def reset(self, building):
+        super().reset(building)
+        # Building.get_travel_time_matrix of each elevator, as lists (faster to index one number at a time)
+        self.travel_times = [building.get_travel_time_matrix(elevator).tolist() for elevator in building.elevators]
+        self.ready_times = [None] * len(building.elevators)
+        self.ready_floors = [0] * len(building.elevators)
+        self.floor_marks = [0] * building.n_floors  # floors counted by ready_time, marked with self.mark
+        self.mark = 0
+
+    def dispatch(self, building):
+        elevators = building.elevators
+        claimed = self.claimed
+        action = self.action
+        ready_times = self.ready_times
+        ready_floors = self.ready_floors
+        for elevator_index, elevator in enumerate(elevators):
+            if self.is_idle(elevator) and elevator.n_riders > 0:
+                floor_num = self.current_floor_num(elevator, building)
+                self.send(elevator_index, self.nearest_car_call(elevator_index, elevator, floor_num), floor_num)
+        hall_calls = self.hall_calls
+        n_hall_calls = self.update_hall_calls(building)
+        if n_hall_calls == 0:
+            return
+
+        for elevator_index, elevator in enumerate(elevators):
+            if action[elevator_index] is not None or elevator.n_riders >= elevator.max_riders:
+                ready_times[elevator_index] = None
+            else:
+                ready_times[elevator_index], ready_floors[elevator_index] = self.ready_time(elevator_index, elevator,
+                                                                                            building)
+
+        while True:
+            best_time = None
+            best_elevator_index = None
+            best_stop = None
+            for elevator_index in range(0, len(elevators)):
+                ready_time = ready_times[elevator_index]
+                if ready_time is None:
+                    continue
+                travel_times = self.travel_times[elevator_index][ready_floors[elevator_index]]
+                for call_index in range(0, n_hall_calls):
+                    stop = hall_calls[call_index]
+                    if claimed[stop]:
+                        continue
+                    arrival_time = ready_time + travel_times[stop]
+                    if best_time is None or arrival_time < best_time:
+                        best_time = arrival_time
+                        best_elevator_index = elevator_index
+                        best_stop = stop
+            if best_time is None:
+                return
+            elevator = elevators[best_elevator_index]
+            if self.is_idle(elevator):
+                self.send(best_elevator_index, best_stop, self.current_floor_num(elevator, building))
+                ready_times[best_elevator_index] = None
+            else:
+                claimed[best_stop] = True
+
+    def ready_time(self, elevator_index, elevator, building):
+        """
+        Returns (seconds from now until the elevator can head to a new call, floor number it is then on): after its
+        queued stops, it takes its riders whose destinations are not queued, and those it boards at its last queued
+        stop, to the nearer end of their destinations and then the farther one, with avg_boarding_time at each.
+        """
+        free_time, free_floor_num = elevator.estimate_free_time(building)
+        self.mark += 1
+        mark = self.mark
+        floor_marks = self.floor_marks
+        for floor in elevator.queued_floors:
+            floor_marks[floor.floor_number] = mark
+        n_stops = 0
+        n_staying = 0
+        lowest = highest = free_floor_num
+        for destination, riders in elevator.riders_by_destination.items():
+            if floor_marks[destination] == mark:
+                continue
+            floor_marks[destination] = mark
+            n_stops += 1
+            n_staying += len(riders)
+            lowest = min(lowest, destination)
+            highest = max(highest, destination)
+
+        if len(elevator.queued_floors) > 0:
+            last_floor = elevator.queued_floors[-1]
+            room = elevator.max_riders - n_staying
+            for people in (last_floor.people_going_up, last_floor.people_going_down):
+                for person in people:
+                    if room <= 0:
+                        break
+                    room -= 1
+                    if floor_marks[person.destination] != mark:
+                        floor_marks[person.destination] = mark
+                        n_stops += 1
+                        lowest = min(lowest, person.destination)
+                        highest = max(highest, person.destination)
+        if n_stops == 0:
+            return free_time, free_floor_num
+
+        travel_times = self.travel_times[elevator_index]
+        if free_floor_num - lowest <= highest - free_floor_num:
+            nearer_end, farther_end = lowest, highest
+        else:
+            nearer_end, farther_end = highest, lowest
+        return (free_time + travel_times[free_floor_num][nearer_end] + travel_times[nearer_end][farther_end] +
+                n_stops * elevator.avg_boarding_time), farther_end
@@ -4,6 +4,8 @@ Author: Daniel Nichols
 from src.ElevatorState import ElevatorState
 from src.elevator_motion import ElevatorMotion
 from src.building import Building
+from src.Person import Person
+from src.trajectory import Trajectory
 from math import sqrt
 
 
@@ -49,7 +51,19 @@ class Elevator:
         #       For people waiting for an elevator, the building should decide which elevator is best situated to pick them up,
         #               and add their floor to that elevator's requests.
         self.queued_floors = []
-        self.riders = []
+        self.riders_by_destination = dict()  # destination floor number -> riders going there, in boarding order
+        self.n_riders = 0
+
+        # estimate_arrival_time cache: the state it was computed for, arrival time per queued floor number, and when
+        # and where the elevator is free after its last queued stop
+        self.eta_cache_key = None
+        self.eta_cache_building = None
+        self.stop_arrival_times = dict()
+        self.free_time = 0.0
+        self.free_floor_num = 0
+        self.trajectory = None  # get_trajectory cache, with the state it was computed for
+        self.trajectory_cache_key = None
+        self.trajectory_cache_building = None
 
     def physics_calc(self, building, total_time_increment):
         """
@@ -337,6 +351,165 @@ class Elevator:
             print("Error: calc_time_to_reach_distance would return time less than 0")
         return max(larger, 0.0)
 
+    def calc_time_to_reach_position(self, desired_position):
+        """
+        Closed-form time for the elevator to come to rest at desired_position from its current position, velocity and
+        prev_acc_dec. Follows the same branches as physics_calc (speed up, cruise, slow down), so stepping
+        step_realistic_physics by the returned time lands the elevator on desired_position.
+        """
+        speed, time_speeding_up, time_at_constant_rate, time_slowing_down = \
+            self.calc_movement_phases(desired_position)
+        return time_speeding_up + time_at_constant_rate + time_slowing_down
+
+    def calc_movement_phases(self, desired_position, from_position=None):
+        """
+        Splits the movement timed by calc_time_to_reach_position into its phases.
+        from_position -- if given, plan the movement from rest at from_position instead (for legs after the next stop)
+        Returns -- tuple of starting speed, seconds speeding up (at max_acc), seconds at constant rate (at the speed
+        reached by then) and seconds slowing down (at max_dec)
+        """
+        time_threshold = .02
+        if from_position is None:
+            position, velocity, prev_acc_dec = self.position, self.velocity, self.prev_acc_dec
+            # An idle or loading elevator starts its next movement from rest (time_since_beg_of_action is reset to 0)
+            starting_movement = (self.state != ElevatorState.UP and self.state != ElevatorState.DOWN) or \
+                self.time_since_beg_of_action < time_threshold
+        else:
+            position, velocity, prev_acc_dec, starting_movement = from_position, 0.0, ElevatorMotion.NEITHER, True
+        total_remaining_dist = abs(position - desired_position)
+        speed = abs(velocity)
+        acc = abs(self.max_acc)
+        dec = abs(self.max_dec)
+
+        if prev_acc_dec == ElevatorMotion.GETTING_FASTER or \
+                (prev_acc_dec == ElevatorMotion.NEITHER and starting_movement):
+            # Same (signed) test physics_calc uses to pick speeding_up_calc_dist_time over the abbreviated version
+            if position < desired_position:
+                time_to_reach_max_velocity = self.calc_time_to_reach_velocity(self.max_velocity, velocity,
+                                                                              self.max_acc)
+            else:
+                time_to_reach_max_velocity = self.calc_time_to_reach_velocity(-self.max_velocity, velocity,
+                                                                              -self.max_acc)
+            dist_covered_to_reach_max_velocity = self.calc_distance_per_time(speed, self.max_acc,
+                                                                             time_to_reach_max_velocity)
+            dist_to_max_and_stop = dist_covered_to_reach_max_velocity + self.dist_to_stop_from_max_velocity
+            if dist_to_max_and_stop <= total_remaining_dist:
+                time_req_hit_max_speed = (abs(self.max_velocity) - speed) / acc
+                dist_req_hit_max_speed = self.calc_distance_per_time(speed, acc, time_req_hit_max_speed)
+                dist_at_constant_rate = total_remaining_dist - dist_req_hit_max_speed - \
+                    self.calc_distance_per_time(self.max_velocity, -dec, self.max_velocity / dec)
+                return speed, time_req_hit_max_speed, abs(dist_at_constant_rate / self.max_velocity), \
+                    self.max_velocity / dec
+            # Won't hit max velocity; same quadratic as abbr_velocity_calc_dist_time
+            quad_a = acc / 2 + acc * acc / 2 / dec
+            quad_b = speed + acc * speed / dec
+            quad_c = -total_remaining_dist + speed * speed / 2 / dec
+            q_success, larger, smaller = self.quadratic_formula(quad_a, quad_b, quad_c)
+            time_speeding_up = max(larger, 0.0)
+            return speed, time_speeding_up, 0.0, (speed + acc * time_speeding_up) / dec
+        elif prev_acc_dec == ElevatorMotion.NEITHER:
+            # Cruising; same split as constant_rate_calc_dist_time
+            time_req_to_stop = speed / dec
+            dist_req_to_stop = self.calc_distance_per_time(speed, -dec, time_req_to_stop)
+            return speed, 0.0, abs((total_remaining_dist - dist_req_to_stop) / speed), time_req_to_stop
+        else:
+            return speed, 0.0, 0.0, speed / dec
+
+    def estimate_arrival_time(self, floor, building):
+        """
+        Seconds from now until the elevator reaches floor (a Floor or floor number). If floor is already queued, this
+        is its arrival at the first queued visit; otherwise it is its arrival after serving every queued stop. Counts
+        the rest of the current movement (calc_time_to_reach_position) or dwell, avg_boarding_time at each stop before
+        floor, and building.get_travel_time_matrix for the legs between stops.
+        The arrival times of all the queued stops are computed together and cached until the elevator's position,
+        velocity, motion, state or queued_floors change, so repeated calls cost a dict lookup.
+        """
+        floor_num = getattr(floor, "floor_number", floor)
+        self.refresh_arrival_times(building)
+        arrival_time = self.stop_arrival_times.get(floor_num)
+        if arrival_time is None:
+            arrival_time = self.free_time + \
+                building.get_travel_time_matrix(self)[self.free_floor_num, floor_num]
+        return float(arrival_time)
+
+    def estimate_free_time(self, building):
+        """
+        Returns (seconds from now until the elevator has served every queued stop, floor number it is then on), with
+        the same estimate and cache as estimate_arrival_time.
+        """
+        self.refresh_arrival_times(building)
+        return self.free_time, self.free_floor_num
+
+    def refresh_arrival_times(self, building):
+        key = (self.position, self.velocity, self.state, self.prev_acc_dec, self.time_since_beg_of_action,
+               self.avg_boarding_time, tuple(queued_floor.floor_number for queued_floor in self.queued_floors))
+        if key != self.eta_cache_key or building is not self.eta_cache_building:
+            self.update_arrival_times(building)
+            self.eta_cache_key = key
+            self.eta_cache_building = building
+
+    def update_arrival_times(self, building):
+        # Time the elevator is at rest (done moving or dwelling) at its current floor
+        if self.state == ElevatorState.LOADING_UNLOADING:
+            time_to_rest = max(self.avg_boarding_time - self.time_since_beg_of_action, 0.0)
+        else:
+            time_to_rest = 0.0
+
+        self.stop_arrival_times = dict()  # queued floor number -> arrival time at its first visit
+        if len(self.queued_floors) == 0:
+            self.free_time = time_to_rest
+            self.free_floor_num = building.get_floor_by_position(self.position).floor_number
+            return
+
+        travel_times = building.get_travel_time_matrix(self)
+        previous_floor_num = self.queued_floors[0].floor_number
+        arrival_time = time_to_rest + self.calc_time_to_reach_position(previous_floor_num * building.floor_dist)
+        self.stop_arrival_times[previous_floor_num] = arrival_time
+        for queued_floor in self.queued_floors[1:]:
+            arrival_time += self.avg_boarding_time + travel_times[previous_floor_num, queued_floor.floor_number]
+            previous_floor_num = queued_floor.floor_number
+            self.stop_arrival_times.setdefault(previous_floor_num, arrival_time)
+        self.free_time = arrival_time + self.avg_boarding_time
+        self.free_floor_num = previous_floor_num
+
+    def get_trajectory(self, building, start_time=0.0):
+        """
+        Returns the Trajectory of the elevator through all its queued stops, starting at start_time (e.g.
+        building.clock): the rest of the current dwell or movement, then for each later stop avg_boarding_time at rest
+        and a movement from rest. Movements follow calc_movement_phases, so each stop is reached at the time
+        estimate_arrival_time gives. Cached until the elevator's state or queued_floors change.
+        """
+        key = (self.position, self.velocity, self.state, self.prev_acc_dec, self.time_since_beg_of_action,
+               self.avg_boarding_time, tuple(queued_floor.floor_number for queued_floor in self.queued_floors),
+               start_time)
+        if key == self.trajectory_cache_key and building is self.trajectory_cache_building:
+            return self.trajectory
+
+        acc = abs(self.max_acc)
+        dec = abs(self.max_dec)
+        trajectory = Trajectory(start_time, self.position)
+        if self.state == ElevatorState.LOADING_UNLOADING:
+            trajectory.add_wait(self.avg_boarding_time - self.time_since_beg_of_action)
+        from_position = None
+        for queued_floor in self.queued_floors:
+            desired_position = queued_floor.floor_number * building.floor_dist
+            if from_position is not None:
+                trajectory.add_wait(self.avg_boarding_time)
+            direction = 1.0 if trajectory.final_position <= desired_position else -1.0
+            speed, time_speeding_up, time_at_constant_rate, time_slowing_down = \
+                self.calc_movement_phases(desired_position, from_position)
+            cruise_speed = speed + acc * time_speeding_up
+            trajectory.add_segment(time_speeding_up, direction * acc, direction * speed)
+            trajectory.add_segment(time_at_constant_rate, 0.0, direction * cruise_speed)
+            trajectory.add_segment(time_slowing_down, -direction * dec, direction * cruise_speed)
+            trajectory.stop_at(desired_position)
+            from_position = desired_position
+
+        self.trajectory = trajectory
+        self.trajectory_cache_key = key
+        self.trajectory_cache_building = building
+        return trajectory
+
     @staticmethod
     def quadratic_formula(a, b, c):
         under_radical = b * b - 4 * a * c
@@ -353,67 +526,57 @@ class Elevator:
     def load_unload(self, desired_floor_num, building, time_remaining, time_inc):
         # Person.destination and Elevator.max_riders determine if a rider gets on/off
         desired_floor = building.floors[desired_floor_num]
-
-        # Unload passengers first - may open up more capacity. Iterate backwards to be able to remove riders
-        for rider_index in range(self.get_num_riders() - 1, -1, -1):
-            rider = self.riders[rider_index]
-            if rider.destination == desired_floor_num:
+        action_time = building.clock + time_inc - time_remaining
+
+        # Unload passengers first - may open up more capacity. Everyone going to this floor is in one bucket; go
+        # through it last boarded first
+        riders_leaving = self.riders_by_destination.pop(desired_floor_num, None)
+        if riders_leaving is not None:
+            self.n_riders -= len(riders_leaving)
+            for rider in reversed(riders_leaving):
                 rider.waiting_state = 0
-                rider.wait_time += time_inc - time_remaining
-                self.remove_rider_index(rider_index)
+                rider.alight_time = action_time
+                building.delivered_wait_times.append(rider.get_wait_time(action_time))
+                building.person_alighted(self, rider)
 
         # Load passengers - only do so if it is a 1 elevator system or if there is a queued floor after this one
+        capacity = max(self.max_riders - self.n_riders, 0)
         if len(self.queued_floors) > 1:
             next_floor_num = self.queued_floors[1].floor_number
+
+            # Only the people going the way of the next queued floor get on; the call stays on if some are left behind
+            if next_floor_num > desired_floor_num:
+                boarding = desired_floor.pop_people_going_up(capacity)
+            elif next_floor_num < desired_floor_num:
+                boarding = desired_floor.pop_people_going_down(capacity)
+            else:
+                boarding = []
             if next_floor_num < desired_floor_num:
-                desired_floor.down_pressed = False
+                desired_floor.down_pressed = len(desired_floor.people_going_down) > 0
             else:
-                desired_floor.up_pressed = False
-
-            # Create list of rider (indexes) to transfer from the floor to the elevator
-            rider_indexes_to_transfer = []
-            for rider_num in range(0, len(desired_floor.people_waiting)):
-                if next_floor_num > desired_floor_num and \
-                        desired_floor.people_waiting[rider_num].destination > desired_floor_num:
-                    rider_indexes_to_transfer.append(rider_num)
-                elif next_floor_num < desired_floor_num and \
-                        desired_floor.people_waiting[rider_num].destination < desired_floor_num:
-                    rider_indexes_to_transfer.append(rider_num)
-
-            rider_indexes_transferred = []
-            if len(rider_indexes_to_transfer) > 0:
-                for rider_num in range(0, min(len(rider_indexes_to_transfer), self.max_riders - self.get_num_riders())):
-                    # Add rider to the elevator
-                    rider_indexes_transferred.append(rider_num)
-                    desired_floor.people_waiting[rider_num].waiting_state = -1
-                    self.riders.append(desired_floor.people_waiting[rider_num])
-
-            if len(rider_indexes_transferred) > 0:
-                # Remove rider from the floor. Do in reverse order since popping.
-                for rider_num in range(len(rider_indexes_transferred) - 1, -1, -1):
-                    desired_floor.people_waiting.pop(rider_num)
-        elif len(building.elevators) == 1:
-            # With the one elevator case (RL v1), we won't have another queued floor (determined afterwards)
+                desired_floor.up_pressed = len(desired_floor.people_going_up) > 0
+        elif len(building.elevators) == 1 or building.board_at_last_stop:
+            # With the one elevator case (RL v1) and with joint-action RL (rl_step_func_multi), we won't have another
+            # queued floor (determined afterwards)
             desired_floor.down_pressed = False
             desired_floor.up_pressed = False
 
-            # Create list of rider (indexes) to transfer from the floor to the elevator
-            rider_indexes_to_transfer = []
-            for rider_num in range(0, len(desired_floor.people_waiting)):
-                rider_indexes_to_transfer.append(rider_num)
-
-            rider_indexes_transferred = []
-            if len(rider_indexes_to_transfer) > 0:
-                for rider_num in range(0, min(len(rider_indexes_to_transfer), self.max_riders - self.get_num_riders())):
-                    # Add rider to the elevator
-                    rider_indexes_transferred.append(rider_num)
-                    desired_floor.people_waiting[rider_num].waiting_state = -1
-                    self.riders.append(desired_floor.people_waiting[rider_num])
+            # Everyone gets on (in order of arrival) as long as there is room
+            boarding = desired_floor.pop_people(capacity)
+            if building.board_at_last_stop:
+                # Dispatching (src/dispatch.py) goes by the buttons, so the people a full elevator left behind keep
+                # their calls on (RL v1 observations keep both buttons off)
+                desired_floor.up_pressed = len(desired_floor.people_going_up) > 0
+                desired_floor.down_pressed = len(desired_floor.people_going_down) > 0
+        else:
+            boarding = []
 
-            if len(rider_indexes_transferred) > 0:
-                # Remove rider from the floor. Do in reverse order since popping.
-                for rider_num in range(len(rider_indexes_transferred) - 1, -1, -1):
-                    desired_floor.people_waiting.pop(rider_num)
+        if len(boarding) > 0:
+            for rider in boarding:
+                rider.waiting_state = -1
+                rider.board_time = action_time
+                self.add_rider(rider)
+            building.people_boarded(desired_floor_num, self, boarding)
 
         # Loading/unloading done, so remove floor from elevator's queued_floors
         if len(self.queued_floors) > 0:
@@ -548,6 +711,32 @@ class Elevator:
 
         return None
 
+    @property
+    def riders(self):
+        """
+        Tuple of everyone on the elevator, grouped by destination (read-only; use add_rider/remove_rider to change who
+        is on).
+        """
+        return tuple(rider for riders in self.riders_by_destination.values() for rider in riders)
+
+    def snapshot(self):
+        """
+        Returns a flat tuple of the elevator's motion state, queued floor numbers and riders (see Simulator.snapshot).
+        """
+        return self.position, self.velocity, self.prev_acc_dec, self.state, self.time_since_beg_of_action, \
+            tuple(floor.floor_number for floor in self.queued_floors), tuple(rider.snapshot() for rider in self.riders)
+
+    def restore(self, token, building):
+        """
+        Puts the elevator back into the state captured by snapshot. Queued floors are looked up in building.
+        """
+        self.position, self.velocity, self.prev_acc_dec, self.state, self.time_since_beg_of_action, \
+            queued_floor_nums, rider_tokens = token
+        self.queued_floors[:] = [building.floors[floor_num] for floor_num in queued_floor_nums]
+        self.clear_riders()
+        for rider_token in rider_tokens:
+            self.add_rider(Person.restore(rider_token))
+
     def add_rider(self, rider):
         '''
         Adds a rider to the elevator cart.
@@ -557,9 +746,14 @@ class Elevator:
         if rider is None:
             return -1
 
-        self.riders.append(rider)
+        riders = self.riders_by_destination.get(rider.destination)
+        if riders is None:
+            self.riders_by_destination[rider.destination] = [rider]
+        else:
+            riders.append(rider)
+        self.n_riders += 1
         # TODO: See todo in __init__ - rider destination should be added to the list of requested stops
-        return len(self.riders)-1
+        return self.n_riders - 1
 
     def remove_rider(self, rider):
         '''
@@ -569,17 +763,26 @@ class Elevator:
         if rider is None:
             return -1
 
-        if rider in self.riders:
-            self.riders.remove(rider)
+        riders = self.riders_by_destination.get(rider.destination)
+        if riders is not None and rider in riders:
+            riders.remove(rider)
+            self.n_riders -= 1
+            if len(riders) == 0:
+                del self.riders_by_destination[rider.destination]
+        return self.n_riders
 
     def remove_rider_index(self, rider_index):
-        self.riders.pop(rider_index)
+        self.remove_rider(self.riders[rider_index])
+
+    def clear_riders(self):
+        self.riders_by_destination.clear()
+        self.n_riders = 0
 
     def get_num_riders(self):
         '''
         Get the number of riders.
         '''
-        return len(self.riders)
+        return self.n_riders
 
 
     def press_up_button(self):
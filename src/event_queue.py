@@ -0,0 +1,70 @@
+"""
+event_queue.py
+Defines the EventType enum and the EventQueue class used by the discrete-event step functions.
+"""
+import heapq
+from enum import auto, Enum, unique
+
+
+@unique
+class EventType(Enum):
+    PERSON_ARRIVAL = auto()  # the person scheduler spawns one or more people
+    ELEVATOR_ARRIVAL = auto()  # an elevator comes to rest at the first of its queued_floors
+    DWELL_END = auto()  # an elevator finishes loading/unloading
+
+
+class EventQueue:
+    """
+    Heap of future events ordered by time. Each event is pushed under a key (e.g. an elevator index); pushing a new
+    event under a key replaces the pending one, so each key has at most one live event at a time.
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.n_pushed = 0  # tie breaker so events at the same time pop in the order they were pushed
+        self.versions = dict()  # key -> version of its live event; heap entries with older versions are stale
+
+    def push(self, time, event_type, key, payload=None):
+        """
+        Schedules an event, replacing any pending event with the same key.
+        """
+        version = self.versions.get(key, 0) + 1
+        self.versions[key] = version
+        heapq.heappush(self.heap, (time, self.n_pushed, version, key, event_type, payload))
+        self.n_pushed += 1
+
+    def invalidate(self, key):
+        """
+        Drops the pending event for key (if any).
+        """
+        if key in self.versions:
+            self.versions[key] += 1
+
+    def pop(self):
+        """
+        Removes and returns the earliest live event.
+        Returns -- tuple of (time, event_type, key, payload), or None if there are no live events
+        """
+        self.discard_stale()
+        if len(self.heap) == 0:
+            return None
+        time, _, _, key, event_type, payload = heapq.heappop(self.heap)
+        self.versions[key] += 1  # the popped event is no longer live
+        return time, event_type, key, payload
+
+    def peek_time(self):
+        """
+        Returns the time of the earliest live event, or None if there are no live events.
+        """
+        self.discard_stale()
+        if len(self.heap) == 0:
+            return None
+        return self.heap[0][0]
+
+    def discard_stale(self):
+        while len(self.heap) > 0 and self.heap[0][2] != self.versions[self.heap[0][3]]:
+            heapq.heappop(self.heap)
+
+    def __len__(self):
+        self.discard_stale()
+        return sum(1 for entry in self.heap if entry[2] == self.versions[entry[3]])
@@ -1,6 +1,11 @@
 """
 Author: Owen Barbour
 """
+from collections import deque
+from heapq import merge
+from operator import attrgetter
+
+from src.Person import Person
 
 
 class Floor:
@@ -14,18 +19,113 @@ class Floor:
 
         Parameters:
         floor_number -- floor of the building
-        people_waiting -- array of initial people waiting for elevator
+        people_waiting -- array of initial people waiting for elevator (in order of arrival)
         up_pressed -- up button on floor is pressed
         down_pressed -- down button on floor is pressed
         """
         self.floor_number = floor_number
+        self.observation = None  # Building.observation, which mirrors the buttons of this floor (set by Building)
+        self.observation_index = 0  # index of the up button in observation; the down button follows
         self.up_pressed = up_pressed
         self.down_pressed = down_pressed
 
-        if people_waiting is None:
-            self.people_waiting = []
+        # People waiting to go up/down, each in order of arrival (Person.queue_number)
+        self.people_going_up = deque()
+        self.people_going_down = deque()
+        self.n_arrived = 0  # number of people ever added; gives the next Person.queue_number
+        if people_waiting is not None:
+            for person in people_waiting:
+                self.add_person(person)
+
+    @property
+    def people_waiting(self):
+        """
+        Tuple of everyone waiting on this floor, in order of arrival (read-only; use add_person/pop_people to change
+        who is waiting).
+        """
+        return tuple(merge(self.people_going_up, self.people_going_down, key=attrgetter("queue_number")))
+
+    def get_num_people_waiting(self):
+        return len(self.people_going_up) + len(self.people_going_down)
+
+    def add_person(self, person):
+        """
+        Adds a person to the end of the up or down queue (by their destination). Does not press any button.
+        """
+        person.queue_number = self.n_arrived
+        self.n_arrived += 1
+        if person.destination > self.floor_number:
+            self.people_going_up.append(person)
         else:
-            self.people_waiting = people_waiting
+            self.people_going_down.append(person)
+
+    def pop_people(self, max_people):
+        """
+        Removes and returns up to max_people people, going up or down, in order of arrival.
+        """
+        people_going_up = self.people_going_up
+        people_going_down = self.people_going_down
+        people = []
+        while len(people) < max_people and (people_going_up or people_going_down):
+            if not people_going_down or \
+                    (people_going_up and people_going_up[0].queue_number < people_going_down[0].queue_number):
+                people.append(people_going_up.popleft())
+            else:
+                people.append(people_going_down.popleft())
+        return people
+
+    def pop_people_going_up(self, max_people):
+        """
+        Removes and returns up to max_people of the people going up, in order of arrival.
+        """
+        return [self.people_going_up.popleft() for _ in range(0, min(max_people, len(self.people_going_up)))]
+
+    def pop_people_going_down(self, max_people):
+        """
+        Removes and returns up to max_people of the people going down, in order of arrival.
+        """
+        return [self.people_going_down.popleft() for _ in range(0, min(max_people, len(self.people_going_down)))]
+
+    def clear_people_waiting(self):
+        self.people_going_up.clear()
+        self.people_going_down.clear()
+
+    @property
+    def up_pressed(self):
+        return self._up_pressed
+
+    @up_pressed.setter
+    def up_pressed(self, pressed):
+        self._up_pressed = pressed
+        if self.observation is not None:
+            self.observation[self.observation_index] = pressed is True
+
+    @property
+    def down_pressed(self):
+        return self._down_pressed
+
+    @down_pressed.setter
+    def down_pressed(self, pressed):
+        self._down_pressed = pressed
+        if self.observation is not None:
+            self.observation[self.observation_index + 1] = pressed is True
+
+    def snapshot(self):
+        """
+        Returns a flat tuple of the floor's button presses and waiting people (see Simulator.snapshot).
+        """
+        return self.up_pressed, self.down_pressed, tuple(person.snapshot() for person in self.people_going_up), \
+            tuple(person.snapshot() for person in self.people_going_down)
+
+    def restore(self, token):
+        """
+        Puts the floor back into the state captured by snapshot.
+        """
+        self.up_pressed, self.down_pressed, up_tokens, down_tokens = token
+        self.people_going_up.clear()
+        self.people_going_up.extend(Person.restore(person_token) for person_token in up_tokens)
+        self.people_going_down.clear()
+        self.people_going_down.extend(Person.restore(person_token) for person_token in down_tokens)
 
     # DO NOT USE
     def pickup_going_up(self):
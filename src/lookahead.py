@@ -0,0 +1,183 @@
+"""
+lookahead.py
+Defines the BranchRunner and LookaheadPlanner classes: a Monte Carlo lookahead planner that tries each candidate floor
+on branches of the current simulation state (Simulator.snapshot/restore, no deepcopy) across a process pool.
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.PersonScheduler import PersonScheduler
+from src.random_streams import replica_seed_sequence
+from src.simulator import Simulator, realistic_physics_step_func
+
+
+def make_candidate_action(sim, default_action, floor_num):
+    """
+    Returns -- the action sending an elevator to floor_num: floor_num itself for single-action step functions
+    (rl_step_func_v1); for joint actions (rl_step_func_multi), default_action with floor_num given to the first
+    elevator that needs an action
+    """
+    if not isinstance(default_action, list):
+        return floor_num
+    action = list(default_action)
+    elevator_indexes = sim.get_elevators_needing_action()
+    action[elevator_indexes[0] if len(elevator_indexes) > 0 else 0] = floor_num
+    return action
+
+
+class BranchRunner:
+    """
+    BranchRunner class.
+    Builds the Simulator/Building/Elevator of a RolloutConfig once, plus a PersonScheduler that is reseeded for each
+    branch to sample the arrivals after the branch point. Runs branches from base states captured in another process.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        building = config.make_building()
+        self.sim = Simulator('branch', step_func=realistic_physics_step_func, reward_func=config.reward_func,
+                             rl_step_func=config.rl_step_func)
+        self.sim.init_building(building)
+        self.person_scheduler = PersonScheduler(building, poisson_mean_density=config.poisson_mean_density,
+                                                p_seed=config.seed, seconds_to_schedule=0)
+
+    def run_branch(self, base_state, plan_seed, branch_index, floor_num, horizon, lookahead_seconds):
+        """
+        Restores base_state, takes the candidate action of floor_num, then horizon - 1 more actions of the config's
+        policy, against arrivals sampled from replica branch_index of plan_seed over the next lookahead_seconds.
+        Branch i of every candidate samples the same arrivals, so candidates are compared on equal terms.
+        Returns -- total reward of the branch
+        """
+        sim = self.sim
+        policy = self.config.policy
+        sim.building.delivered_wait_times.clear()  # not part of the branch; restore only truncates it
+        sim.restore(base_state)
+        person_scheduler = self.person_scheduler
+        person_scheduler.start_seconds = sim.total_time
+        person_scheduler.seconds_to_schedule = sim.total_time + lookahead_seconds
+        person_scheduler.reseed(replica_seed_sequence(plan_seed, branch_index))
+
+        state_list = sim.get_state()[1]
+        total_reward = 0.0
+        for step_num in range(0, horizon):
+            if sim.total_time >= person_scheduler.seconds_to_schedule:
+                break
+            action = policy(sim, state_list, step_num)
+            if step_num == 0:
+                action = make_candidate_action(sim, action, floor_num)
+            state_list, reward, bld = sim.rl_step(starting_time=sim.total_time, action=action,
+                                                  person_scheduler=person_scheduler)
+            total_reward += reward
+        return total_reward
+
+    def run_branches(self, base_state, plan_seed, branches, horizon, lookahead_seconds):
+        """
+        branches -- list of (floor_num, branch_index)
+        Returns -- list of total rewards, one per branch
+        """
+        return [self.run_branch(base_state, plan_seed, branch_index, floor_num, horizon, lookahead_seconds)
+                for floor_num, branch_index in branches]
+
+
+# The BranchRunner of the current worker process (set by init_worker)
+worker_runner = None
+
+
+def init_worker(config):
+    global worker_runner
+    worker_runner = BranchRunner(config)
+
+
+def run_worker_branches(base_state, plan_seed, branches, horizon, lookahead_seconds):
+    return worker_runner.run_branches(base_state, plan_seed, branches, horizon, lookahead_seconds)
+
+
+class LookaheadPlanner:
+    """
+    LookaheadPlanner class.
+    Picks an action by Monte Carlo lookahead: each candidate floor is tried on n_branches branches of the current
+    state, each rolled forward horizon decisions (the candidate, then the config's policy) against freshly sampled
+    arrivals, and the floor with the best mean total reward wins. The branches are split across a
+    ProcessPoolExecutor whose workers each build their environment once (BranchRunner); each chunk of branches gets
+    the one read-only base state, which the worker restores before every branch.
+    Plans are reproducible: plan i samples its arrivals from replica i of config.seed, whatever the number of workers.
+    """
+
+    def __init__(self, config, n_branches=8, horizon=10, lookahead_seconds=600, candidate_floors=None,
+                 max_workers=None):
+        """
+        Arguments:
+        config -- RolloutConfig of the environment being planned for (floors, elevators, elevator_kwargs, arrival
+                  density, reward_func, rl_step_func); config.policy is the default policy of the rollouts and
+                  config.seed the root seed of the sampled arrivals. Must be picklable (see RolloutConfig).
+        n_branches -- branches (arrival samples) per candidate floor
+        horizon -- decisions per branch, the candidate's included
+        lookahead_seconds -- arrivals are sampled this far past the current time; a branch ends there
+        candidate_floors -- floors to try (default: every floor)
+        max_workers -- number of worker processes (None = number of CPUs; 0 = run in this process)
+        """
+        self.config = config
+        self.n_branches = n_branches
+        self.horizon = horizon
+        self.lookahead_seconds = lookahead_seconds
+        self.candidate_floors = list(range(0, config.n_floors)) if candidate_floors is None else candidate_floors
+        self.max_workers = max_workers
+        self.n_plans = 0
+        self.mean_rewards = None  # candidate floor -> mean total reward, of the last plan
+        self.plan_seconds = 0.0  # wall time of the last plan
+
+        self.runner = None
+        self.executor = None
+        self.n_chunks = 1
+        if max_workers == 0:
+            self.runner = BranchRunner(config)
+        else:
+            self.executor = ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker, initargs=(config,))
+            self.n_chunks = os.cpu_count() if max_workers is None else max_workers
+
+    def plan(self, sim):
+        """
+        Plans from the current state of sim (which is left untouched).
+        Returns -- the action to pass to sim.rl_step: the best candidate floor, or for joint actions the config's
+        policy's action with the best floor given to the first elevator that needs an action
+        """
+        start_time = time.perf_counter()
+        total_time, old_total_time, building_state, scheduler_state = sim.snapshot()
+        # The branches sample their own arrivals, so the state of sim's PersonScheduler is left out
+        base_state = (total_time, old_total_time, building_state, None)
+        plan_seed = replica_seed_sequence(self.config.seed, self.n_plans)
+        self.n_plans += 1
+
+        branches = [(floor_num, branch_index) for floor_num in self.candidate_floors
+                    for branch_index in range(0, self.n_branches)]
+        if self.executor is None:
+            rewards = self.runner.run_branches(base_state, plan_seed, branches, self.horizon, self.lookahead_seconds)
+        else:
+            # One task per worker, so the base state is sent once per worker rather than once per branch
+            chunks = [branches[chunk_index::self.n_chunks] for chunk_index in range(0, self.n_chunks)]
+            futures = [self.executor.submit(run_worker_branches, base_state, plan_seed, chunk, self.horizon,
+                                            self.lookahead_seconds) for chunk in chunks if len(chunk) > 0]
+            rewards = [None] * len(branches)
+            for chunk_index, future in enumerate(futures):
+                rewards[chunk_index::self.n_chunks] = future.result()
+
+        reward_table = np.array(rewards, dtype=float).reshape(len(self.candidate_floors), self.n_branches)
+        self.mean_rewards = dict(zip(self.candidate_floors, reward_table.mean(axis=1).tolist()))
+        best_floor = self.candidate_floors[int(np.argmax(reward_table.mean(axis=1)))]
+        self.plan_seconds = time.perf_counter() - start_time
+
+        return make_candidate_action(sim, self.config.policy(sim, sim.get_state()[1], 0), best_floor)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -0,0 +1,124 @@
+"""
+profiler.py
+Defines the Profiler class, which counts calls and times the simulation hot paths (see Simulator.enable_profiling).
+"""
+import time
+
+import src.simulator as simulator_module
+from src.PersonScheduler import PersonScheduler
+from src.elevator import Elevator
+
+# (owner, attribute, profile name) of every function timed while profiling. Names are grouped by prefix, e.g. all
+# Elevator.physics_calc branches start with "physics_calc.".
+PROFILED_FUNCTIONS = [
+    (simulator_module, "realistic_physics_step_func", "realistic_physics_step_func"),
+    (Elevator, "step_realistic_physics", "elevator.step_realistic_physics"),
+    (Elevator, "physics_calc", "physics_calc"),
+    (Elevator, "speeding_up_calc_dist_time", "physics_calc.speeding_up"),
+    (Elevator, "constant_rate_calc_dist_time", "physics_calc.constant_rate"),
+    (Elevator, "slowing_down_calc_dist_time", "physics_calc.slowing_down"),
+    (Elevator, "abbr_velocity_calc_dist_time", "physics_calc.abbreviated"),
+    (Elevator, "load_unload", "load_unload"),
+    (PersonScheduler, "get_time_and_people_of_next_addition", "scheduler.next_addition"),
+    (PersonScheduler, "get_arrivals_between", "scheduler.arrivals_between"),
+]
+
+# The Profiler whose timers are installed (only one at a time, since the class-level ones are shared)
+active_profiler = None
+
+
+class Profiler:
+    """
+    Profiler class.
+    While installed, wraps the hot-path functions (PROFILED_FUNCTIONS plus the rl_step_func, step_func, get_state and
+    reward of one Simulator) with timers that count calls and add up wall time. Times are inclusive: a function's time
+    includes the functions it calls. Nothing is wrapped while it is not installed, so disabled profiling costs nothing.
+    """
+
+    def __init__(self):
+        self.counts = dict()  # profile name -> number of calls
+        self.times = dict()  # profile name -> total seconds
+        self.patches = []  # (owner, attribute, original value or None if the owner had none of its own)
+
+    def timed(self, name, func):
+        """
+        Returns a wrapper of func which records each call under name.
+        """
+        counts = self.counts
+        times = self.times
+        counts.setdefault(name, 0)
+        times.setdefault(name, 0.0)
+        perf_counter = time.perf_counter
+
+        def timed_func(*args, **kwargs):
+            start_time = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                times[name] += perf_counter() - start_time
+                counts[name] += 1
+
+        timed_func.__wrapped__ = func
+        return timed_func
+
+    def patch(self, owner, attribute, name):
+        own_attributes = owner.__dict__ if isinstance(owner, type) else vars(owner)
+        original = own_attributes.get(attribute)
+        self.patches.append((owner, attribute, original))
+        setattr(owner, attribute, self.timed(name, getattr(owner, attribute) if original is None else original))
+
+    def install(self, sim):
+        """
+        Starts timing the hot paths, plus sim's rl_step_func, step_func, get_state and reward_func.
+        """
+        global active_profiler
+        if active_profiler is not None:
+            raise RuntimeError("Another Profiler is already installed")
+        active_profiler = self
+
+        # Simulator.step calls sim.step_func directly, rl_step_func_v1 calls the module function: same entry
+        if sim.step_func is simulator_module.realistic_physics_step_func:
+            step_func_name = "realistic_physics_step_func"
+        else:
+            step_func_name = "step_func"
+        for owner, attribute, name in PROFILED_FUNCTIONS:
+            self.patch(owner, attribute, name)
+        self.patch(sim, "rl_step_func", "rl_step_func")
+        self.patch(sim, "step_func", step_func_name)
+        self.patch(sim, "get_state", "get_state")
+        self.patch(sim, "reward_func", "reward")
+
+    def uninstall(self):
+        """
+        Puts every wrapped function back. The recorded counts and times are kept.
+        """
+        global active_profiler
+        for owner, attribute, original in reversed(self.patches):
+            if original is None:
+                delattr(owner, attribute)
+            else:
+                setattr(owner, attribute, original)
+        self.patches = []
+        if active_profiler is self:
+            active_profiler = None
+
+    def reset(self):
+        for name in self.counts:
+            self.counts[name] = 0
+            self.times[name] = 0.0
+
+    def report(self):
+        """
+        Returns -- dict of profile name -> {"calls", "total_seconds", "mean_seconds"} for every function called at
+        least once, slowest total first
+        """
+        names = sorted((name for name in self.counts if self.counts[name] > 0), key=lambda name: -self.times[name])
+        return {name: {"calls": self.counts[name], "total_seconds": self.times[name],
+                       "mean_seconds": self.times[name] / self.counts[name]} for name in names}
+
+    def format_report(self):
+        lines = ["{:<36} {:>10} {:>12} {:>12}".format("function", "calls", "total (s)", "mean (us)")]
+        for name, stats in self.report().items():
+            lines.append("{:<36} {:>10} {:>12.4f} {:>12.2f}".format(name, stats["calls"], stats["total_seconds"],
+                                                                     stats["mean_seconds"] * 1e6))
+        return "\n".join(lines)
@@ -0,0 +1,34 @@
+"""
+random_streams.py
+Helpers for giving every stochastic component (PersonScheduler arrivals, and any boarding or dispatch randomness) its
+own np.random.Generator stream, derived from one np.random.SeedSequence instead of the global NumPy state.
+"""
+import numpy as np
+
+
+def as_seed_sequence(seed):
+    """
+    Arguments:
+    seed -- int, sequence of ints, None (fresh entropy from the OS) or an np.random.SeedSequence (returned as is)
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    return np.random.SeedSequence(seed)
+
+
+def replica_seed_sequence(seed, replica_index):
+    """
+    Returns -- the SeedSequence of replica replica_index of seed: the same as as_seed_sequence(seed).spawn(n)
+    [replica_index] (for any n > replica_index), without spawning the others. Replicas get independent,
+    non-overlapping streams, and each one is reproducible on its own whichever worker creates it.
+    """
+    seed_sequence = as_seed_sequence(seed)
+    return np.random.SeedSequence(seed_sequence.entropy, spawn_key=seed_sequence.spawn_key + (replica_index,),
+                                  pool_size=seed_sequence.pool_size)
+
+
+def spawn_generators(seed, n):
+    """
+    Returns -- list of n independent np.random.Generator, one per component or replica
+    """
+    return [np.random.default_rng(child) for child in as_seed_sequence(seed).spawn(n)]
@@ -0,0 +1,190 @@
+"""
+rollout_pool.py
+Defines the RolloutConfig, EpisodeRunner and RolloutPool classes for running many RL episodes across CPU cores.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from src.PersonScheduler import PersonScheduler
+from src.building import Building
+from src.elevator import Elevator
+from src.random_streams import replica_seed_sequence
+from src.simulator import Simulator, realistic_physics_step_func, reward_sum_people, rl_step_func_multi, \
+    rl_step_func_v1
+
+
+def cycle_floors_policy(sim, state_list, step_num):
+    """
+    Default policy: send the elevator to floors 1, 2, ..., n_floors - 1, 0, 1, ... in turn (as in carl_test_novis.py).
+    """
+    return (step_num + 1) % sim.building.n_floors
+
+
+class RolloutConfig:
+    """
+    RolloutConfig class.
+    Picklable description of the environment and policy each rollout worker builds. policy and reward_func must be
+    module-level functions so they can be sent to worker processes.
+    """
+
+    def __init__(self, n_floors=10, n_elevators=1, poisson_mean_density=.05, episode_seconds=10000, max_steps=None,
+                 seed=1, policy=cycle_floors_policy, reward_func=reward_sum_people, rl_step_func=rl_step_func_v1,
+                 elevator_kwargs=None, board_at_last_stop=None):
+        """
+        Creates a RolloutConfig object.
+
+        Arguments:
+        n_floors -- number of floors in the building
+        n_elevators -- number of elevators in the building
+        poisson_mean_density -- mean people spawned per second
+        episode_seconds -- an episode ends once sim.total_time reaches this; also the PersonScheduler horizon
+        max_steps -- optional limit on rl_steps per episode
+        seed -- root seed; episode i always uses replica i of it (random_streams.replica_seed_sequence), whichever
+                worker runs it
+        policy -- function (sim, state_list, step_num) -> action (destination floor)
+        elevator_kwargs -- extra keyword arguments for each Elevator (max_velocity, avg_boarding_time, ...)
+        board_at_last_stop -- see Building (None = only with rl_step_func_multi, which needs it)
+        """
+        self.n_floors = n_floors
+        self.n_elevators = n_elevators
+        self.poisson_mean_density = poisson_mean_density
+        self.episode_seconds = episode_seconds
+        self.max_steps = max_steps
+        self.seed = seed
+        self.policy = policy
+        self.reward_func = reward_func
+        self.rl_step_func = rl_step_func
+        self.elevator_kwargs = dict() if elevator_kwargs is None else elevator_kwargs
+        self.board_at_last_stop = board_at_last_stop
+
+    def make_building(self):
+        """
+        Returns -- a new Building with the configured floors and elevators
+        """
+        elevators = [Elevator(elevator_num, **self.elevator_kwargs) for elevator_num in range(0, self.n_elevators)]
+        board_at_last_stop = self.board_at_last_stop
+        if board_at_last_stop is None:
+            board_at_last_stop = self.rl_step_func is rl_step_func_multi
+        return Building(name=0, elevators=elevators, n_floors=self.n_floors, board_at_last_stop=board_at_last_stop)
+
+
+class EpisodeRunner:
+    """
+    EpisodeRunner class.
+    Builds the Simulator/Building/Elevator/PersonScheduler for a RolloutConfig once and runs episodes on it, going back
+    to the initial snapshot and reseeding the PersonScheduler at the start of each one.
+    """
+
+    def __init__(self, config):
+        self.config = config
+        building = config.make_building()
+        self.sim = Simulator('rollout', step_func=realistic_physics_step_func, reward_func=config.reward_func,
+                             rl_step_func=config.rl_step_func)
+        self.sim.init_building(building)
+        self.initial_state = self.sim.snapshot()
+        self.person_scheduler = PersonScheduler(building, poisson_mean_density=config.poisson_mean_density,
+                                                p_seed=config.seed, seconds_to_schedule=config.episode_seconds)
+
+    def run_episode(self, episode_index):
+        """
+        Runs one episode with the PersonScheduler seeded by replica episode_index of the config's seed.
+        Returns -- dict of episode results (total reward, wait time statistics of delivered people, steps/s, ...)
+        """
+        config = self.config
+        self.sim.restore(self.initial_state)
+        self.person_scheduler.reseed(replica_seed_sequence(config.seed, episode_index))
+
+        start_time = time.perf_counter()
+        total_reward = 0.0
+        step_num = 0
+        state_list = self.sim.get_state()[1]
+        while self.sim.total_time < config.episode_seconds and \
+                (config.max_steps is None or step_num < config.max_steps):
+            action = config.policy(self.sim, state_list, step_num)
+            state_list, reward, bld = self.sim.rl_step(starting_time=self.sim.total_time, action=action,
+                                                       person_scheduler=self.person_scheduler)
+            total_reward += reward
+            step_num += 1
+        wall_time = time.perf_counter() - start_time
+
+        wait_times = np.array(self.sim.building.delivered_wait_times)
+        if len(wait_times) > 0:
+            mean_wait_time = float(np.mean(wait_times))
+            p50_wait_time, p90_wait_time, p99_wait_time = (float(p) for p in np.percentile(wait_times, [50, 90, 99]))
+        else:
+            mean_wait_time = p50_wait_time = p90_wait_time = p99_wait_time = float("nan")
+        return {
+            "episode_index": episode_index,
+            "total_reward": total_reward,
+            "n_steps": step_num,
+            "sim_seconds": self.sim.total_time,
+            "n_delivered": len(wait_times),
+            "mean_wait_time": mean_wait_time,
+            "p50_wait_time": p50_wait_time,
+            "p90_wait_time": p90_wait_time,
+            "p99_wait_time": p99_wait_time,
+            "steps_per_second": step_num / wall_time if wall_time > 0 else float("inf"),
+        }
+
+
+# The EpisodeRunner of the current worker process (set by init_worker)
+worker_runner = None
+
+
+def init_worker(config):
+    global worker_runner
+    worker_runner = EpisodeRunner(config)
+
+
+def run_worker_episode(episode_index):
+    return worker_runner.run_episode(episode_index)
+
+
+class RolloutPool:
+    """
+    RolloutPool class.
+    Runs episodes of a RolloutConfig across a ProcessPoolExecutor. Every worker builds its environment once; episode i
+    always uses the same seed, so results do not depend on the number of workers.
+    """
+
+    def __init__(self, config, max_workers=None):
+        """
+        Arguments:
+        config -- RolloutConfig shared by all workers
+        max_workers -- number of worker processes (None = number of CPUs; 0 = run in this process)
+        """
+        self.config = config
+        self.max_workers = max_workers
+        self.executor = None
+        if max_workers != 0:
+            self.executor = ProcessPoolExecutor(max_workers=max_workers, initializer=init_worker, initargs=(config,))
+
+    def run(self, n_episodes, first_episode=0):
+        """
+        Runs episodes first_episode, ..., first_episode + n_episodes - 1.
+        Returns -- generator yielding each episode's result dict as soon as it finishes (in completion order; use
+        "episode_index" to match them up)
+        """
+        episode_indexes = range(first_episode, first_episode + n_episodes)
+        if self.executor is None:
+            runner = EpisodeRunner(self.config)
+            for episode_index in episode_indexes:
+                yield runner.run_episode(episode_index)
+            return
+
+        futures = [self.executor.submit(run_worker_episode, episode_index) for episode_index in episode_indexes]
+        for future in as_completed(futures):
+            yield future.result()
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
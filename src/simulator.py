@@ -3,8 +3,9 @@ author: Daniel Nichols
 """
 from src.ElevatorState import ElevatorState
 from src.elevator_motion import ElevatorMotion
+from src.event_queue import EventQueue, EventType
 
-import numpy as np
+from math import log
 
 
 def default_step_func(cur_building, dt):
@@ -22,20 +23,84 @@ def default_step_func(cur_building, dt):
     return True
 
 
+ARRIVALS_EVENT_KEY = "arrivals"  # EventQueue key of the next PERSON_ARRIVAL event (elevators use their index)
+
+
+def schedule_next_arrival(event_queue, person_scheduler, current_time):
+    """
+    Pushes the next PERSON_ARRIVAL strictly after current_time (nothing is pushed once the schedule is exhausted).
+    """
+    next_spawn_time, people_to_spawn = person_scheduler.get_time_and_people_of_next_addition(
+        current_timestamp=current_time, exclusive=True)
+    if next_spawn_time < 0:
+        event_queue.invalidate(ARRIVALS_EVENT_KEY)
+    else:
+        event_queue.push(next_spawn_time, EventType.PERSON_ARRIVAL, ARRIVALS_EVENT_KEY, people_to_spawn)
+
+
+def schedule_elevator_event(event_queue, elevator_index, cur_building, current_time):
+    """
+    Pushes the next event of an elevator: DWELL_END while it is loading/unloading, ELEVATOR_ARRIVAL while it has a
+    queued floor. An idle elevator has no pending event.
+    """
+    elevator = cur_building.elevators[elevator_index]
+    if elevator.state == ElevatorState.LOADING_UNLOADING:
+        boarding_time_remaining = max(elevator.avg_boarding_time - elevator.time_since_beg_of_action, 0.0)
+        event_queue.push(current_time + boarding_time_remaining, EventType.DWELL_END, elevator_index)
+    elif len(elevator.queued_floors) > 0:
+        desired_floor_height = elevator.queued_floors[0].floor_number * cur_building.floor_dist
+        event_queue.push(current_time + elevator.calc_time_to_reach_position(desired_floor_height),
+                         EventType.ELEVATOR_ARRIVAL, elevator_index)
+    else:
+        event_queue.invalidate(elevator_index)
+
+
+def process_next_event(cur_building, current_time, event_queue, person_scheduler):
+    """
+    Advances the building straight to the earliest pending event and handles it. Elevators whose state changed on the
+    way (e.g. one that came to rest just before an arrival event) get their event rescheduled.
+    Return -- new system time, or None if no events are pending
+    """
+    event = event_queue.pop()
+    if event is None:
+        return None
+    event_time, event_type, key, people_to_spawn = event
+
+    time_inc = max(event_time - current_time, 0.0)
+    if event_type == EventType.DWELL_END:
+        # A remaining dwell too small to survive being added to current_time must still end the loading/unloading
+        elevator = cur_building.elevators[key]
+        time_inc = max(time_inc, elevator.avg_boarding_time - elevator.time_since_beg_of_action)
+
+    states_before = [e.state for e in cur_building.elevators]
+    realistic_physics_step_func(cur_building, time_inc)
+    current_time = max(event_time, current_time)
+
+    if event_type == EventType.PERSON_ARRIVAL:
+        person_scheduler.spawn_people(event_time, people_to_spawn)
+        schedule_next_arrival(event_queue, person_scheduler, current_time)
+    for elevator_index, elevator in enumerate(cur_building.elevators):
+        if elevator_index == key or elevator.state != states_before[elevator_index]:
+            schedule_elevator_event(event_queue, elevator_index, cur_building, current_time)
+    return current_time
+
+
 def rl_step_func_v1(cur_building, starting_time, action, person_scheduler, time_inc=3):
     """
     Reinforcement learning step function does the following:
     1) add the action
     2a) If elevator’s state is NO_ACTION and no people in system, progress until a floor is pressed.
-    2b) Else, call step func (calls realistic_physics_step_func (with abbr_step_option=True)) and queue people as
-    needed until there is no longer a queued elevator.
+    2b) Else, jump from event to event (person arrivals, the elevator reaching its floor, loading/unloading ending)
+    until there is no longer a queued elevator.
 
     Note: this is for a one elevator system ONLY.
     Note: cur_building and the internal elevator need to be a deep copy
+    Note: people spawning at exactly the returned time have already been spawned.
+    Note: like rl_step_func_multi, the building is stepped through idle time too, so cur_building.clock (and with it
+    the Person timestamps and wait-time rewards) always advances by the returned time minus starting_time.
 
     action -- destination floor for the single elevator system
-    time_inc -- the amount to step the realistic_physics_step_function at one time. The amount should probably be < 5,
-                but any other changes only affect performance since the option abbr_step_option=True is used.
+    time_inc -- unused; kept for compatibility with callers of the former fixed-increment version
 
     Return -- new system time
     """
@@ -44,25 +109,24 @@ def rl_step_func_v1(cur_building, starting_time, action, person_scheduler, time_
     action_floor_height = cur_building.floor_dist * action
 
     # number of people at action floor/current floor
-    if cur_building.floors[action].people_waiting is None:
-        num_people_action_floor = 0
-    else:
-        num_people_action_floor = len(cur_building.floors[action].people_waiting)
+    num_people_action_floor = cur_building.floors[action].get_num_people_waiting()
 
     # print(str(action_floor_height), str(cur_elev_pos))
     if abs(action_floor_height - cur_elev_pos) < .01 and num_people_action_floor == 0:
         next_spawn_time, people_to_spawn = person_scheduler.get_time_and_people_of_next_addition(
-            current_timestamp=starting_time, update_min_index_20_less=True)
-        if next_spawn_time > starting_time + 1:
+            current_timestamp=starting_time, exclusive=True)
+        if next_spawn_time < 0 or next_spawn_time > starting_time + 1:
+            realistic_physics_step_func(cur_building, 1)
             return starting_time + 1
         else:
+            realistic_physics_step_func(cur_building, next_spawn_time - starting_time)
             person_scheduler.spawn_people(next_spawn_time, people_to_spawn)
-            return next_spawn_time + .001
+            return next_spawn_time
     elif abs(action_floor_height - cur_elev_pos) < .01:
         # People are waiting on the elevator and giving the same floor as an action is legitimate.
         # This part puts the elevator into loading/unloading with 0 time elapsed, and does the loading/unloading
-        # Since this section isn't returned, the second case should catch this and finish the loading/unloading while
-        # adding people as needed
+        # Since this section isn't returned, the event loop below finishes the loading/unloading while adding people
+        # as needed
         cur_building.elevators[0].prev_acc_dec = ElevatorMotion.NEITHER
 
         # Run loading/unloading procedure - pop off the floor and move the people (on & off)
@@ -79,41 +143,126 @@ def rl_step_func_v1(cur_building, starting_time, action, person_scheduler, time_
 
     if cur_building.elevators[0].state == ElevatorState.NO_ACTION and cur_building.get_total_people_in_system() == 0:
         next_spawn_time, people_to_spawn = person_scheduler.get_time_and_people_of_next_addition(
-            current_timestamp=current_time, update_min_index_20_less=True)
-        person_scheduler.spawn_people(next_spawn_time, people_to_spawn)
+            current_timestamp=current_time, exclusive=True)
         if cur_building.elevators[0].queued_floors is not None and len(cur_building.elevators[0].queued_floors) >= 1:
             cur_building.elevators[0].queued_floors.pop(0)
-        # print(str(next_spawn_time))
-        return next_spawn_time + .001
+        if next_spawn_time < 0:
+            # The schedule is exhausted; nobody presses a button again before the end of the scheduled time
+            end_time = max(current_time, person_scheduler.seconds_to_schedule)
+            realistic_physics_step_func(cur_building, end_time - current_time)
+            cur_building.event_queue_time = end_time
+            return end_time
+        realistic_physics_step_func(cur_building, next_spawn_time - current_time)
+        person_scheduler.spawn_people(next_spawn_time, people_to_spawn)
+        return next_spawn_time
 
-    # Second: ELSE, call step func and queue people as needed until there is no longer a queued elevator
+    # Second: ELSE, jump from event to event, spawning people as needed, until there is no longer a queued elevator
+    event_queue = EventQueue()
+    schedule_next_arrival(event_queue, person_scheduler, current_time)
+    schedule_elevator_event(event_queue, 0, cur_building, current_time)
     while len(cur_building.elevators[0].queued_floors) > 0 or \
             cur_building.elevators[0].state == ElevatorState.LOADING_UNLOADING:
-        # print("Running while")
-        next_spawn_time, people_to_spawn = person_scheduler.get_time_and_people_of_next_addition(
-            current_timestamp=current_time, update_min_index_20_less=True)
-        time_till_next_spawn = next_spawn_time - current_time
-
-        if time_till_next_spawn < time_inc:
-            # People are going to spawn before the standard time_inc can be elapsed
-            return_cond, actual_time_inc = realistic_physics_step_func(cur_building, time_till_next_spawn,
-                                                                       abbr_step_option=True)
-            if abs(actual_time_inc - time_till_next_spawn) < .001:
-                # Implies loading/unloading didn't finish early, so we are ready to spawn the people
-                person_scheduler.spawn_people(next_spawn_time, people_to_spawn)
-                current_time = next_spawn_time + .001
-            else:
-                # The loading/unloading did finish early (actual_time_inc < time_till_next_spawn)
-                current_time += actual_time_inc
-                pass
-        else:
-            # People aren't going to spawn before the standard time_inc can be elapsed
-            return_cond, actual_time_inc = realistic_physics_step_func(cur_building, time_inc,
-                                                                       abbr_step_option=True)
-            current_time += actual_time_inc
+        current_time = process_next_event(cur_building, current_time, event_queue, person_scheduler)
     return current_time
 
 
+def get_elevators_needing_action(cur_building):
+    """
+    Returns the indexes of the elevators that need a new action: idle, with no queued floor and not loading/unloading.
+    """
+    return [elevator_index for elevator_index, elevator in enumerate(cur_building.elevators)
+            if elevator.state == ElevatorState.NO_ACTION and len(elevator.queued_floors) == 0]
+
+
+def rl_step_func_multi(cur_building, starting_time, action, person_scheduler, time_inc=3):
+    """
+    Reinforcement learning step function for any number of elevators (one action per elevator):
+    1) add each elevator's action. An idle elevator sent to the floor it is on loads the people waiting there (or
+    stays idle if there are none); otherwise the floor is queued after the elevator's other queued floors.
+    2) jump from event to event until an elevator needs a new action (see get_elevators_needing_action): one finishes
+    loading/unloading at its last queued floor, or people arrive while an elevator is idle. So while every elevator
+    is idle and nobody is in the system, this skips straight to the next arrival. While every elevator is idle and
+    people are waiting (the actions left them there), it returns after at most 1 second.
+
+    Elevators board everyone waiting (up to capacity) at their last queued floor, like the single elevator of
+    rl_step_func_v1, since their next destination is only chosen afterwards: cur_building must be created with
+    board_at_last_stop=True (RolloutConfig does this for rl_step_func_multi).
+    Note: people spawning at exactly the returned time have already been spawned.
+    The pending events are kept on cur_building for the next call, which only reschedules the elevators it gives an
+    action to. Change the building between calls only through Building.restore (or Simulator.restore/reset), which
+    drops them.
+
+    action -- sequence with one destination floor (or None for no new floor) per elevator
+    time_inc -- unused; same signature as rl_step_func_v1
+
+    Return -- new system time; get_elevators_needing_action(cur_building) then gives the elevators to act on
+    """
+    if not cur_building.board_at_last_stop:
+        raise ValueError("rl_step_func_multi needs a Building created with board_at_last_stop=True")
+    elevators = cur_building.elevators
+    current_time = starting_time
+
+    # First: implement the actions
+    for elevator_index, elevator in enumerate(elevators):
+        floor_num = action[elevator_index]
+        if floor_num is None:
+            continue
+        idle = elevator.state == ElevatorState.NO_ACTION and len(elevator.queued_floors) == 0
+        if idle and abs(floor_num * cur_building.floor_dist - elevator.position) < .01:
+            if cur_building.floors[floor_num].get_num_people_waiting() > 0:
+                # Same as rl_step_func_v1: load/unload with 0 time elapsed; the event loop finishes the dwell
+                elevator.prev_acc_dec = ElevatorMotion.NEITHER
+                elevator.load_unload(floor_num, cur_building, time_remaining=0, time_inc=0)
+                elevator.state = ElevatorState.LOADING_UNLOADING
+                elevator.time_since_beg_of_action = 0
+        else:
+            elevator.queued_floors.append(cur_building.floors[floor_num])
+
+    # Second: jump from event to event until an elevator needs an action. The events left pending by the last call
+    # carry over, so only the elevators given an action are rescheduled
+    event_queue = cur_building.event_queue
+    if event_queue is None or cur_building.event_queue_time != starting_time or \
+            cur_building.event_queue_scheduler is not person_scheduler:
+        event_queue = EventQueue()
+        cur_building.event_queue = event_queue
+        cur_building.event_queue_scheduler = person_scheduler
+        schedule_next_arrival(event_queue, person_scheduler, current_time)
+        for elevator_index in range(0, len(elevators)):
+            schedule_elevator_event(event_queue, elevator_index, cur_building, current_time)
+    else:
+        for elevator_index in range(0, len(elevators)):
+            if action[elevator_index] is not None:
+                schedule_elevator_event(event_queue, elevator_index, cur_building, current_time)
+    cur_building.event_queue_time = None  # set again on return
+    busy = [elevator.state != ElevatorState.NO_ACTION or len(elevator.queued_floors) > 0 for elevator in elevators]
+    any_busy = any(busy)
+    while True:
+        if not any_busy and cur_building.n_people_in_system > 0:
+            next_event_time = event_queue.peek_time()
+            if next_event_time is None or next_event_time > starting_time + 1:
+                realistic_physics_step_func(cur_building, starting_time + 1 - current_time)
+                cur_building.event_queue_time = starting_time + 1
+                return starting_time + 1
+
+        # Only PERSON_ARRIVAL events add people to the system
+        n_people_before = cur_building.n_people_in_system
+        new_time = process_next_event(cur_building, current_time, event_queue, person_scheduler)
+        if new_time is None:
+            # The schedule is exhausted and every elevator is idle
+            end_time = max(current_time, person_scheduler.seconds_to_schedule)
+            realistic_physics_step_func(cur_building, end_time - current_time)
+            cur_building.event_queue_time = end_time
+            return end_time
+        current_time = new_time
+
+        people_arrived = cur_building.n_people_in_system > n_people_before
+        for elevator_index, elevator in enumerate(elevators):
+            if elevator.state == ElevatorState.NO_ACTION and len(elevator.queued_floors) == 0 and \
+                    (busy[elevator_index] or people_arrived):
+                cur_building.event_queue_time = current_time
+                return current_time
+
+
 def realistic_physics_step_func(cur_building, time_inc, abbr_step_option=False):
     """
     Step function which uses realistic physics calculations/movements
@@ -131,45 +280,27 @@ def realistic_physics_step_func(cur_building, time_inc, abbr_step_option=False):
                 # print("Abbreviating time")
                 new_time_inc = boarding_time_remaining + .0001  # Account for rounding error
 
-    # Update position and passengers of elevators (and floors if there is any loading/unloading done
+    # Update position and passengers of elevators (and floors if there is any loading/unloading done). Idle elevators
+    # with no queued floor stay as they are
     for e in cur_building.elevators:
-        # Elevator class's step_realistic_physics...
-        e.step_realistic_physics(cur_building, new_time_inc)
-
-        # Update wait times of elevator riders
-        for person in e.riders:
-            person.wait_time += new_time_inc
+        if e.state != ElevatorState.NO_ACTION or len(e.queued_floors) > 0:
+            # Elevator class's step_realistic_physics...
+            e.step_realistic_physics(cur_building, new_time_inc)
 
-    # Update the waiting time of people on floors still
-    for floor in cur_building.floors:
-        for person in floor.people_waiting:
-            person.wait_time += new_time_inc
+    # Wait times are derived from the clock and each Person's timestamps, so there is nothing to update per person
+    cur_building.clock += new_time_inc
 
     return True, new_time_inc
 
 
 # Default reward function -- returns -(sum # people) where # people includes those waiting for and on elevators
 def reward_sum_people(sim):
-    cur_building = sim.building
-    sum_people = 0
-    for e in cur_building.elevators:
-        if e.riders is not None:
-            sum_people += len(e.riders)
-    for floor in cur_building.floors:
-        if floor.people_waiting is not None:
-            sum_people += len(floor.people_waiting)
-    return -sum_people
+    return -sim.building.n_people_in_system
 
 previous_position = 0
 def reward_sum_people_same_floor_bad(sim):
     cur_building = sim.building
-    sum_people = 0
-    for e in cur_building.elevators:
-        if e.riders is not None:
-            sum_people += len(e.riders)
-    for floor in cur_building.floors:
-        if floor.people_waiting is not None:
-            sum_people += len(floor.people_waiting)
+    sum_people = cur_building.n_people_in_system
     global previous_position
     same_action = cur_building.elevators[0].position == previous_position 
     previous_position = cur_building.elevators[0].position
@@ -177,38 +308,16 @@ def reward_sum_people_same_floor_bad(sim):
 
 #Incorporate the length of the RL step - this has the opposite of intended effect don't use
 def reward_sum_people_by_time(sim): 
-    cur_building = sim.building
-    sum_people = 0
-    for e in cur_building.elevators:
-        if e.riders is not None:
-            sum_people += len(e.riders)
-    for floor in cur_building.floors:
-        if floor.people_waiting is not None:
-            sum_people += len(floor.people_waiting)
+    sum_people = sim.building.n_people_in_system
     return -sum_people*(sim.total_time-sim.old_total_time)
 
 #Carl did this function so it might not work
 def reward_sum_wait_time(sim):
-    cur_building = sim.building
-    sum_time = 0
-    for e in cur_building.elevators:
-        if e.riders is not None:
-            sum_time += np.sum([p.wait_time for p in e.riders])
-    for floor in cur_building.floors:
-        if floor.people_waiting is not None:
-            sum_time += np.sum([p.wait_time for p in floor.people_waiting])
-    return -sum_time
+    return -sim.building.get_sum_wait_times()
     
 def reward_log_sum_wait_time(sim):
-    cur_building = sim.building
-    sum_time = 0
-    for e in cur_building.elevators:
-        if e.riders is not None:
-            sum_time += np.sum([p.wait_time for p in e.riders])
-    for floor in cur_building.floors:
-        if floor.people_waiting is not None:
-            sum_time += np.sum([p.wait_time for p in floor.people_waiting])
-    return -np.log(sum_time+.1)
+    sum_time = sim.building.get_sum_wait_times()
+    return -log(sum_time+.1)
 
 class Simulator:
     """
@@ -221,9 +330,12 @@ class Simulator:
         """
         self.name = name
         self.total_time = 0  # total time elapsed
+        self.old_total_time = 0  # total_time before the last rl_step
+        self.person_scheduler = None  # person_scheduler of the last rl_step; its cursor is part of snapshots
         self.step_func = step_func
         self.rl_step_func = rl_step_func
         self.reward_func = reward_func
+        self.profiler = None  # Profiler while profiling is enabled
 
     def init_building(self, building):
         self.building = building
@@ -234,11 +346,14 @@ class Simulator:
     def rl_step(self, starting_time, action, person_scheduler, time_inc=3):
         """
         Step function version used for RL
+        Returns -- tuple of (state, reward, building); state is a new array from get_state, so it can be kept (e.g. in
+        a replay buffer) after later steps
         """
         if self.building is None:
             print('Building not initialized')
             return None
 
+        self.person_scheduler = person_scheduler
         self.old_total_time = self.total_time
         self.total_time = self.rl_step_func(self.building, starting_time, action, person_scheduler, time_inc=time_inc)
 
@@ -246,6 +361,60 @@ class Simulator:
         reward = self.reward()
         return state_list, reward, bld
 
+    def get_elevators_needing_action(self):
+        """
+        Returns the indexes of the elevators to give a new action to (see rl_step_func_multi).
+        """
+        return get_elevators_needing_action(self.building)
+
+    def snapshot(self):
+        """
+        Captures the full simulation state (times, building, floors, elevators, people and the cursor of the last
+        person_scheduler given to rl_step) in a flat tuple. People are stored by reference together with their
+        mutable fields, so nothing is deep-copied; the same token can be restored any number of times.
+        Returns -- token to pass to restore
+        """
+        if self.person_scheduler is None:
+            scheduler_token = None
+        else:
+            scheduler_token = self.person_scheduler.snapshot()
+        return self.total_time, self.old_total_time, self.building.snapshot(), scheduler_token
+
+    def restore(self, token):
+        """
+        Puts the simulation back into the state captured by snapshot.
+        """
+        self.total_time, self.old_total_time, building_token, scheduler_token = token
+        self.building.restore(building_token)
+        if scheduler_token is not None:
+            self.person_scheduler.restore(scheduler_token)
+
+    def enable_profiling(self):
+        """
+        Starts counting calls and timing the hot paths: rl_step_func, realistic_physics_step_func, the physics_calc
+        branches, load_unload, the PersonScheduler lookups, get_state and the reward. Costs nothing while disabled.
+        Only one Simulator can be profiled at a time.
+        Returns -- the Profiler (see Profiler.report and Profiler.format_report)
+        """
+        from src.profiler import Profiler
+
+        if self.profiler is None:
+            profiler = Profiler()
+            profiler.install(self)  # raises RuntimeError if another Simulator is profiled; nothing is kept then
+            self.profiler = profiler
+        return self.profiler
+
+    def disable_profiling(self):
+        """
+        Stops profiling and removes every timer.
+        Returns -- the Profiler with the results so far (None if profiling was not enabled)
+        """
+        profiler = self.profiler
+        if profiler is not None:
+            profiler.uninstall()
+            self.profiler = None
+        return profiler
+
     def step(self, dt=1.0):
         """
         step the Simulator forward
@@ -272,34 +441,19 @@ class Simulator:
         while self._running:
             self._running = self.step()
 
-    def get_state(self):
-        """
-        Creates a list of state variables which go into a list that will be used to calculate a reward
-        Returns -- tuple of (building, state list)
+    def get_state(self, out=None):
         """
-        states = []
+        Returns the state used by the RL and to calculate a reward: for each elevator, the number of riders going to
+        each floor; then a 0/1 for the up and down buttons of each floor; then the number of people waiting on each
+        floor. The building keeps this up to date in place (see Building.observation), so nothing is rebuilt here.
 
-        # For each elevator, and for each floor, add a 0/1 for a floor button press
-        for elevator in self.building.elevators:
-            dest_floors_dict = dict()
-            for rider in elevator.riders:
-                dest_floors_dict[rider.destination] = dest_floors_dict.get(rider.destination, 0) + 1
-            for floor in self.building.floors:
-                states.append(dest_floors_dict.get(floor.floor_number, 0))
-
-        # Add up/down button presses for outside each floor
-        for floor in self.building.floors:
-            states.append(int(floor.up_pressed is True))
-            states.append(int(floor.down_pressed is True))
-
-        # Add numbers of people waiting outside of each floor
-        for floor in self.building.floors:
-            if floor.people_waiting is not None:
-                states.append(len(floor.people_waiting))
-            else:
-                states.append(0)
-
-        return self.building, states
+        out -- optional array of the same length to copy the state into (to reuse one array across steps)
+        Returns -- tuple of (building, state). state is out if given, otherwise a new copy of Building.observation.
+        """
+        if out is not None:
+            out[:] = self.building.observation
+            return self.building, out
+        return self.building, self.building.observation.copy()
 
     def reset(self):
         """
@@ -307,21 +461,20 @@ class Simulator:
         """
         # Clear elevator riders
         for elevator in self.building.elevators:
-            if elevator.riders is not None:
-                elevator.riders.clear()
-            else:
-                elevator.riders = []
+            elevator.clear_riders()
 
         # Clear floor waiting people and floor button presses
         for floor in self.building.floors:
-            if floor.people_waiting is not None:
-                floor.people_waiting.clear()
-            else:
-                floor.people_waiting = []
+            floor.clear_people_waiting()
 
             floor.up_pressed = False
             floor.down_pressed = False
 
+        self.building.delivered_wait_times.clear()
+        self.building.clock = 0.0
+        self.building.event_queue = None
+        self.building.update_people_counts()
+
 
 
 
@@ -0,0 +1,270 @@
+"""
+sweep.py
+Defines the ResultCache and SweepRunner classes for running parameter sweeps (grids of RolloutConfigs) across a process
+pool, with each point's metrics cached on disk.
+"""
+import copy
+import functools
+import glob
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from src.rollout_pool import EpisodeRunner, RolloutConfig
+
+# Sweep parameters passed to every Elevator (RolloutConfig.elevator_kwargs); the other parameters are RolloutConfig
+# attributes (n_floors, n_elevators, poisson_mean_density, episode_seconds, max_steps, seed)
+ELEVATOR_PARAMETERS = ["avg_boarding_time", "max_velocity", "max_acc", "max_dec", "max_riders"]
+
+# Episode result keys averaged into a point's metrics
+EPISODE_METRICS = ["total_reward", "n_steps", "sim_seconds", "n_delivered", "mean_wait_time", "p50_wait_time",
+                   "p90_wait_time", "p99_wait_time"]
+
+code_version_hash = None
+
+
+def get_code_version():
+    """
+    Returns -- hash of the contents of every source file in src/, so cached results are not reused after the
+    simulation code changes
+    """
+    global code_version_hash
+    if code_version_hash is None:
+        digest = hashlib.sha256()
+        src_dir = os.path.dirname(os.path.abspath(__file__))
+        for path in sorted(glob.glob(os.path.join(src_dir, "**", "*.py"), recursive=True)):
+            digest.update(os.path.relpath(path, src_dir).encode())
+            with open(path, "rb") as source_file:
+                digest.update(source_file.read())
+        code_version_hash = digest.hexdigest()
+    return code_version_hash
+
+
+def expand_grid(grid):
+    """
+    Arguments:
+    grid -- dict of parameter name -> list of values
+    Returns -- list of dicts, one per combination of values (the last parameter varies fastest)
+    """
+    names = list(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+def make_point_config(base_config, params):
+    """
+    Returns -- copy of base_config with the parameters of one sweep point applied
+    """
+    config = copy.copy(base_config)
+    config.elevator_kwargs = dict(base_config.elevator_kwargs)
+    for name, value in params.items():
+        if name in ELEVATOR_PARAMETERS:
+            config.elevator_kwargs[name] = value
+        elif name in vars(config) and name != "elevator_kwargs":
+            setattr(config, name, value)
+        else:
+            raise ValueError("Unknown sweep parameter: " + name)
+    return config
+
+
+def describe_error(name, reason):
+    return TypeError("Sweep config value of " + name + " can't be described for the result cache: " + reason +
+                     " (use an int seed, plain numbers and strings, module-level functions or callable objects)")
+
+
+def qualified_name(value, name):
+    """
+    Returns -- module and qualified name of a function or class
+    Raises TypeError for lambdas and functions or classes defined inside functions, whose names don't tell them apart
+    """
+    qualname = value.__qualname__
+    if "<lambda>" in qualname or "<locals>" in qualname:
+        raise describe_error(name, qualname + " is a lambda or defined inside a function")
+    return value.__module__ + "." + qualname
+
+
+def describe_value(value, name):
+    """
+    Returns -- JSON-serializable description of value: functions by module and name; functools.partial objects by
+    function, args and keywords; bound methods by function and instance; callable objects (such as the
+    src/dispatch.py policies) by class and instance attributes, leaving out the ones listed in their
+    runtime_attributes (per-episode state)
+    name -- config attribute the value belongs to (for the error message)
+    """
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (list, tuple)):
+        return [describe_value(item, name) for item in value]
+    if isinstance(value, dict) and all(isinstance(key, str) for key in value):
+        return {key: describe_value(item, name) for key, item in value.items()}
+    if isinstance(value, functools.partial):
+        return {"partial": describe_value(value.func, name), "args": describe_value(value.args, name),
+                "keywords": describe_value(value.keywords, name)}
+    if callable(value):
+        if hasattr(value, "__self__") and hasattr(value, "__func__"):
+            return {"method": qualified_name(value.__func__, name), "self": describe_value(value.__self__, name)}
+        if hasattr(value, "__qualname__"):
+            return qualified_name(value, name)
+        if not hasattr(value, "__dict__"):
+            raise describe_error(name, type(value).__qualname__ + " objects have no attributes to describe")
+        runtime_attributes = getattr(value, "runtime_attributes", ())
+        return {"class": qualified_name(type(value), name),
+                "attributes": {attribute: describe_value(item, name) for attribute, item in vars(value).items()
+                               if attribute not in runtime_attributes}}
+    raise describe_error(name, type(value).__qualname__ + " is not JSON-serializable")
+
+
+def describe_config(config):
+    """
+    Returns -- JSON-serializable dict of everything in config (see describe_value)
+    Raises TypeError for values that can't be described, so that different configs never share a cache key
+    """
+    return {name: describe_value(value, name) for name, value in sorted(vars(config).items())}
+
+
+def run_point(config, n_episodes):
+    """
+    Runs episodes 0, ..., n_episodes - 1 of config.
+    Returns -- dict of metric name -> mean over the episodes (NaN wait times of episodes nobody finished are skipped)
+    """
+    runner = EpisodeRunner(config)
+    episode_results = [runner.run_episode(episode_index) for episode_index in range(0, n_episodes)]
+    metrics = {"n_episodes": n_episodes}
+    for name in EPISODE_METRICS:
+        values = np.array([result[name] for result in episode_results], dtype=float)
+        metrics[name] = float(np.nanmean(values)) if not np.all(np.isnan(values)) else float("nan")
+    return metrics
+
+
+class ResultCache:
+    """
+    ResultCache class.
+    Stores one JSON file per key in a directory. Reading an entry marks it as recently used (file modification time);
+    after each write the least recently used entries are deleted until there are at most max_entries entries taking
+    at most max_bytes bytes.
+    """
+
+    def __init__(self, directory, max_entries=None, max_bytes=None):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key):
+        """
+        Returns -- the stored value of key, or None if it is not in the cache
+        """
+        try:
+            with open(self.path(key)) as entry_file:
+                value = json.load(entry_file)
+        except (OSError, ValueError):
+            return None
+        os.utime(self.path(key))
+        return value
+
+    def put(self, key, value):
+        # Write then rename, so that a crash or a concurrent sweep never leaves a partial entry
+        temp_path = self.path(key) + "." + str(os.getpid()) + ".tmp"
+        with open(temp_path, "w") as entry_file:
+            json.dump(value, entry_file)
+        os.replace(temp_path, self.path(key))
+        self.evict()
+
+    def entries(self):
+        """
+        Returns -- list of (modification time, size, path) of every entry, least recently used first
+        """
+        entries = []
+        for path in glob.glob(os.path.join(self.directory, "*.json")):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        return entries
+
+    def evict(self):
+        entries = self.entries()
+        total_bytes = sum(size for mtime, size, path in entries)
+        for mtime, size, path in entries:
+            if (self.max_entries is None or len(entries) <= self.max_entries) and \
+                    (self.max_bytes is None or total_bytes <= self.max_bytes):
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            entries = entries[1:]
+            total_bytes -= size
+
+
+class SweepRunner:
+    """
+    SweepRunner class.
+    Expands a parameter grid over a base RolloutConfig and runs every point (n_episodes episodes each) across a
+    ProcessPoolExecutor. Each point's metrics are cached under a hash of its full config, n_episodes and the code
+    version, so re-running a sweep after adding parameter values only computes the new points.
+    """
+
+    def __init__(self, grid, base_config=None, n_episodes=4, cache_dir=".sweep_cache", max_cache_entries=None,
+                 max_cache_bytes=None, max_workers=None):
+        """
+        Arguments:
+        grid -- dict of parameter name -> list of values; names are RolloutConfig attributes or ELEVATOR_PARAMETERS
+        base_config -- RolloutConfig giving every parameter not in the grid (default RolloutConfig())
+        n_episodes -- episodes run per point; metrics are averaged over them
+        cache_dir -- directory of the ResultCache (None = no caching)
+        max_cache_entries, max_cache_bytes -- ResultCache eviction limits
+        max_workers -- number of worker processes (None = number of CPUs; 0 = run in this process)
+        """
+        self.grid = grid
+        self.base_config = RolloutConfig() if base_config is None else base_config
+        self.n_episodes = n_episodes
+        self.cache = None if cache_dir is None else ResultCache(cache_dir, max_cache_entries, max_cache_bytes)
+        self.max_workers = max_workers
+        self.n_computed = 0  # points run by the last call to run (the rest came from the cache)
+
+    def point_key(self, config):
+        description = {"config": describe_config(config), "n_episodes": self.n_episodes,
+                       "code_version": get_code_version()}
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def run(self):
+        """
+        Returns -- list of dicts (one per grid point, in expand_grid order) with "params", "metrics" and "cached"
+        """
+        points = expand_grid(self.grid)
+        configs = [make_point_config(self.base_config, params) for params in points]
+        keys = [self.point_key(config) for config in configs]
+        metrics = [None if self.cache is None else self.cache.get(key) for key in keys]
+        cached = [point_metrics is not None for point_metrics in metrics]
+        missing = [point_index for point_index in range(0, len(points)) if metrics[point_index] is None]
+
+        if self.max_workers == 0 or len(missing) <= 1:
+            for point_index in missing:
+                metrics[point_index] = run_point(configs[point_index], self.n_episodes)
+                self.store(keys[point_index], metrics[point_index])
+        else:
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {point_index: executor.submit(run_point, configs[point_index], self.n_episodes)
+                           for point_index in missing}
+                for point_index, future in futures.items():
+                    metrics[point_index] = future.result()
+                    self.store(keys[point_index], metrics[point_index])
+        self.n_computed = len(missing)
+
+        return [{"params": points[point_index], "metrics": metrics[point_index], "cached": cached[point_index]}
+                for point_index in range(0, len(points))]
+
+    def store(self, key, point_metrics):
+        if self.cache is not None:
+            self.cache.put(key, point_metrics)
@@ -0,0 +1,76 @@
+"""
+trajectory.py
+Defines the Trajectory class, the analytic motion of an elevator (see Elevator.get_trajectory), which can be sampled at
+any time without stepping the simulation.
+"""
+from bisect import bisect_right
+
+
+class Trajectory:
+    """
+    Trajectory class.
+    Piecewise constant-acceleration motion: speeding up, cruising, slowing down and dwelling segments one after the
+    other. Positions are heights in meters; velocities are signed (positive going up). Before start_time the elevator
+    is at start_position and after end_time it is at rest at final_position.
+    """
+
+    def __init__(self, start_time, start_position):
+        self.start_time = start_time
+        self.start_position = start_position
+        self.end_time = start_time
+        self.final_position = start_position
+        self.final_velocity = 0.0
+        self.segment_start_times = []
+        self.segments = []  # (start position, start velocity, acceleration) per segment
+        self.last_index = 0  # segment of the last lookup, tried first (frames and planners sample times in order)
+
+    def add_segment(self, duration, acceleration, velocity=None):
+        """
+        Appends duration seconds at constant acceleration from where the trajectory ends.
+        velocity -- starting velocity of the segment (default: the velocity the trajectory ends with)
+        """
+        if duration <= 0:
+            return
+        if velocity is None:
+            velocity = self.final_velocity
+        self.segment_start_times.append(self.end_time)
+        self.segments.append((self.final_position, velocity, acceleration))
+        self.final_position += velocity * duration + .5 * acceleration * duration * duration
+        self.final_velocity = velocity + acceleration * duration
+        self.end_time += duration
+
+    def add_wait(self, duration):
+        self.add_segment(duration, 0.0, 0.0)
+
+    def stop_at(self, position):
+        """
+        Ends the current movement at rest at position (absorbing floating point drift of the segments).
+        """
+        self.final_position = position
+        self.final_velocity = 0.0
+
+    def find_segment(self, time):
+        # Index of the segment containing time (start_time <= time < end_time)
+        index = self.last_index
+        if not (self.segment_start_times[index] <= time and
+                (index + 1 == len(self.segment_start_times) or time < self.segment_start_times[index + 1])):
+            index = bisect_right(self.segment_start_times, time) - 1
+            self.last_index = index
+        return index
+
+    def position(self, time):
+        if time >= self.end_time:
+            return self.final_position
+        if time <= self.start_time:
+            return self.start_position
+        index = self.find_segment(time)
+        position, velocity, acceleration = self.segments[index]
+        dt = time - self.segment_start_times[index]
+        return position + velocity * dt + .5 * acceleration * dt * dt
+
+    def velocity(self, time):
+        if time >= self.end_time or time < self.start_time or len(self.segments) == 0:
+            return 0.0
+        index = self.find_segment(time)
+        position, velocity, acceleration = self.segments[index]
+        return velocity + acceleration * (time - self.segment_start_times[index])
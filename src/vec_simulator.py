@@ -0,0 +1,137 @@
+"""
+vec_simulator.py
+Defines the VecSimulator class, which steps several independent RL simulations with one call.
+"""
+import numpy as np
+
+from src.PersonScheduler import PersonScheduler
+from src.building import Building
+from src.elevator import Elevator
+from src.random_streams import replica_seed_sequence
+from src.simulator import Simulator, realistic_physics_step_func, reward_sum_people, rl_step_func_multi, \
+    rl_step_func_v1
+
+
+class VecSimulator:
+    """
+    VecSimulator class.
+    Owns n_envs independent Simulator/Building/PersonScheduler triples and steps all of them with one action per
+    environment. Observations and rewards are written into preallocated arrays of shape (n_envs, obs_dim) and
+    (n_envs,), and which elevators need an action into needs_action, of shape (n_envs, n_elevators). An environment
+    whose episode is over (sim.total_time reached episode_seconds) is reset automatically.
+    The simulations themselves are not vectorized: step runs each environment's rl_step in turn in a Python loop, and
+    only the batching of the results is done for the caller.
+    """
+
+    def __init__(self, n_envs, n_floors=10, n_elevators=1, poisson_mean_density=.05, episode_seconds=10000, seed=1,
+                 reward_func=reward_sum_people, rl_step_func=None, elevator_kwargs=None):
+        """
+        Creates a VecSimulator object.
+
+        Arguments:
+        n_envs -- number of independent environments
+        n_floors -- number of floors in each building
+        n_elevators -- number of elevators in each building
+        poisson_mean_density -- mean people spawned per second in each building
+        episode_seconds -- simulated seconds per episode; also the horizon of each episode's PersonScheduler
+        seed -- root seed; every (environment, episode) pair gets its own replica of it as PersonScheduler seed
+        rl_step_func -- None = rl_step_func_v1 for one elevator, rl_step_func_multi for several (rl_step_func_v1
+                        only drives the first elevator, so it is rejected with several)
+        elevator_kwargs -- extra keyword arguments for each Elevator (max_velocity, avg_boarding_time, ...)
+        """
+        self.n_envs = n_envs
+        self.n_floors = n_floors
+        self.n_elevators = n_elevators
+        self.poisson_mean_density = poisson_mean_density
+        self.episode_seconds = episode_seconds
+        self.seed = seed
+        self.reward_func = reward_func
+        if rl_step_func is None:
+            rl_step_func = rl_step_func_multi if n_elevators > 1 else rl_step_func_v1
+        elif rl_step_func is rl_step_func_v1 and n_elevators > 1:
+            raise ValueError("rl_step_func_v1 only drives the first elevator; use rl_step_func_multi with " +
+                             str(n_elevators) + " elevators")
+        self.rl_step_func = rl_step_func
+        self.elevator_kwargs = dict() if elevator_kwargs is None else elevator_kwargs
+
+        # Same layout as Simulator.get_state: rider destinations per elevator, up/down buttons, people waiting
+        self.obs_dim = n_elevators * n_floors + 3 * n_floors
+        self.observations = np.zeros((n_envs, self.obs_dim))
+        self.rewards = np.zeros(n_envs)
+        self.dones = np.zeros(n_envs, dtype=bool)
+        # Elevators to give an action to at the next step (see get_elevators_needing_action); rl_step_func_v1 takes
+        # an action at every step
+        self.needs_action = np.ones((n_envs, n_elevators), dtype=bool)
+
+        self.sims = [None] * n_envs
+        self.person_schedulers = [None] * n_envs
+        self.episode_counts = [0] * n_envs
+        for env_index in range(0, n_envs):
+            self.reset_env(env_index)
+
+    def reset_env(self, env_index):
+        """
+        Starts a new episode in one environment with a fresh building and a newly seeded PersonScheduler.
+        """
+        elevators = [Elevator(elevator_num, **self.elevator_kwargs) for elevator_num in range(0, self.n_elevators)]
+        building = Building(name=env_index, elevators=elevators, n_floors=self.n_floors,
+                            board_at_last_stop=self.rl_step_func is rl_step_func_multi)
+        sim = Simulator(name='vec_' + str(env_index), step_func=realistic_physics_step_func,
+                        reward_func=self.reward_func, rl_step_func=self.rl_step_func)
+        sim.init_building(building)
+
+        p_seed = replica_seed_sequence(self.seed, env_index + self.n_envs * self.episode_counts[env_index])
+        self.person_schedulers[env_index] = PersonScheduler(building, poisson_mean_density=self.poisson_mean_density,
+                                                            p_seed=p_seed, seconds_to_schedule=self.episode_seconds)
+        self.sims[env_index] = sim
+        self.episode_counts[env_index] += 1
+
+        sim.get_state(out=self.observations[env_index])
+        self.update_needs_action(env_index)
+
+    def update_needs_action(self, env_index):
+        if self.rl_step_func is rl_step_func_v1:
+            return
+        needs_action = self.needs_action[env_index]
+        needs_action[:] = False
+        needs_action[self.sims[env_index].get_elevators_needing_action()] = True
+
+    def reset(self):
+        """
+        Resets every environment.
+        Returns -- tuple of (observations, needs_action): arrays of shape (n_envs, obs_dim) and (n_envs, n_elevators)
+        """
+        for env_index in range(0, self.n_envs):
+            self.reset_env(env_index)
+        return self.observations, self.needs_action
+
+    def step(self, actions):
+        """
+        Runs one Simulator.rl_step in every environment.
+
+        actions -- array-like of shape (n_envs,) holding the destination floor for each environment, or with
+                   rl_step_func_multi of shape (n_envs, n_elevators) holding each elevator's action (floor or None,
+                   see needs_action)
+
+        Returns -- tuple of (observations, rewards, dones, needs_action, infos). observations/rewards/dones/needs_action
+        are arrays reused across calls (copy them to keep them). For an environment that finished its episode,
+        observations and needs_action are those of the start of its next episode and
+        infos[env_index]["terminal_observation"] is the last observation of the finished one.
+        """
+        infos = [dict() for _ in range(0, self.n_envs)]
+        for env_index, action in enumerate(np.asarray(actions).tolist()):
+            sim = self.sims[env_index]
+            state_list, reward, bld = sim.rl_step(starting_time=sim.total_time, action=action,
+                                                  person_scheduler=self.person_schedulers[env_index])
+            self.rewards[env_index] = reward
+            infos[env_index]["total_time"] = sim.total_time
+
+            done = sim.total_time >= self.episode_seconds
+            self.dones[env_index] = done
+            if done:
+                infos[env_index]["terminal_observation"] = np.array(state_list, dtype=float)
+                self.reset_env(env_index)
+            else:
+                self.observations[env_index] = state_list
+                self.update_needs_action(env_index)
+        return self.observations, self.rewards, self.dones, self.needs_action, infos
@@ -0,0 +1,68 @@
+from src.building import Building
+from src.elevator import Elevator
+
+
+def test_estimates_match_physics():
+    elevator = Elevator(1, avg_boarding_time=4)
+    building = Building(name=1, elevators=[elevator], n_floors=12)
+    queued_floor_nums = [3, 9, 8, 1]
+    elevator.queued_floors[:] = [building.floors[floor_num] for floor_num in queued_floor_nums]
+
+    estimates = [elevator.estimate_arrival_time(floor_num, building) for floor_num in queued_floor_nums]
+    # An unqueued floor is reached after the last stop, its dwell and the trip from there
+    after_last_stop = elevator.estimate_arrival_time(building.floors[5], building)
+    assert abs(after_last_stop - (estimates[-1] + 4 + building.get_travel_time(elevator, 1, 5))) < 1e-9
+
+    # Replay the physics up to each estimate: the stop is reached then and not before
+    clock = 0.0
+    for floor_num, estimate in zip(queued_floor_nums, estimates):
+        elevator.step_realistic_physics(building, estimate - clock - .5)
+        assert elevator.queued_floors[0].floor_number == floor_num
+        elevator.step_realistic_physics(building, .5)
+        assert len(elevator.queued_floors) == 0 or elevator.queued_floors[0].floor_number != floor_num
+        assert abs(elevator.position - floor_num * building.floor_dist) < 1e-9
+        assert abs(elevator.time_since_beg_of_action) < 1e-6
+
+        # Part way through the dwell, the remaining stops are estimated from the rest of the dwell
+        elevator.step_realistic_physics(building, 1.5)
+        clock = estimate + 1.5
+        for later_floor_num, later_estimate in zip(queued_floor_nums[1:], estimates[1:]):
+            if later_floor_num in [floor.floor_number for floor in elevator.queued_floors]:
+                assert abs(elevator.estimate_arrival_time(later_floor_num, building) -
+                           (later_estimate - clock)) < 1e-9
+        elevator.step_realistic_physics(building, elevator.avg_boarding_time - 1.5)
+        clock = estimate + elevator.avg_boarding_time
+
+
+def test_estimates_cached_until_state_changes():
+    elevator = Elevator(1)
+    building = Building(name=1, elevators=[elevator], n_floors=10)
+    assert elevator.estimate_arrival_time(0, building) == 0.0
+    assert elevator.estimate_arrival_time(4, building) == building.get_travel_time(elevator, 0, 4)
+
+    elevator.queued_floors.append(building.floors[6])
+    n_updates = [0]
+    update_arrival_times = elevator.update_arrival_times
+
+    def counting_update(building):
+        n_updates[0] += 1
+        update_arrival_times(building)
+
+    elevator.update_arrival_times = counting_update
+    first = elevator.estimate_arrival_time(2, building)
+    assert elevator.estimate_arrival_time(2, building) == first
+    assert elevator.estimate_arrival_time(6, building) == building.get_travel_time(elevator, 0, 6)
+    assert n_updates[0] == 1
+
+    elevator.step_realistic_physics(building, 1.0)
+    assert elevator.estimate_arrival_time(2, building) < first + 1e-9
+    assert n_updates[0] == 2
+
+
+def run_tests():
+    test_estimates_match_physics()
+    test_estimates_cached_until_state_changes()
+
+
+if __name__ == '__main__':
+    run_tests()
@@ -0,0 +1,26 @@
+from benchmarks.run_benchmarks import compare_results, run_benchmarks
+
+
+def test_benchmarks_smoke():
+    matrix = {"horizons": [1000], "floors": [10], "cars": [1, 3], "densities": [.1]}
+    results = run_benchmarks(matrix, scale=.01, log=lambda line: None)
+
+    benchmarks = set(result["benchmark"] for result in results)
+    assert benchmarks == {"person_scheduler_construction", "elevator_step_realistic_physics",
+                          "rl_step", "get_state", "reward_sum_people",
+                          "reward_sum_wait_time"}
+    assert all(result["seconds_per_call"] > 0 for result in results)
+    assert sorted(result["params"]["cars"] for result in results if result["benchmark"] == "rl_step") == [1, 3]
+
+    # Comparing against itself finds nothing; against a 10x faster baseline everything is a regression
+    assert compare_results({"results": results}, results) == []
+    faster = [dict(result, seconds_per_call=result["seconds_per_call"] / 10) for result in results]
+    assert len(compare_results({"results": faster}, results)) == len(results)
+
+
+def run_tests():
+    test_benchmarks_smoke()
+
+
+if __name__ == '__main__':
+    run_tests()
@@ -0,0 +1,117 @@
+from src.PersonScheduler import PersonScheduler
+from src.building import Building
+from src.Person import Person
+from src.dispatch import CollectiveControlPolicy, DispatchPolicy, EtaPolicy, LookPolicy, NearestCarPolicy
+from src.elevator import Elevator
+from src.rollout_pool import EpisodeRunner, RolloutConfig
+from src.simulator import Simulator, realistic_physics_step_func, reward_sum_people, rl_step_func_multi
+from src.sweep import SweepRunner
+
+POLICIES = [CollectiveControlPolicy, LookPolicy, NearestCarPolicy, EtaPolicy]
+
+
+def test_policies_deliver_everyone():
+    for policy_class in POLICIES:
+        config = RolloutConfig(n_floors=12, n_elevators=3, poisson_mean_density=.1, episode_seconds=20000, seed=4,
+                               policy=policy_class(), rl_step_func=rl_step_func_multi)
+        runner = EpisodeRunner(config)
+        result = runner.run_episode(0)
+        building = runner.sim.building
+        n_spawned = len(building.delivered_wait_times) + building.get_total_people_in_system()
+        assert result["n_delivered"] > .99 * n_spawned, policy_class.__name__
+        assert result["p99_wait_time"] < 200, policy_class.__name__
+
+        # Episodes start over from the same state: the policy's directions are reset too
+        rerun_result = runner.run_episode(0)
+        assert rerun_result["total_reward"] == result["total_reward"]
+        assert rerun_result["n_steps"] == result["n_steps"]
+
+
+def test_full_elevator_leaves_call_on():
+    sim = Simulator('dispatch', step_func=realistic_physics_step_func, reward_func=reward_sum_people,
+                    rl_step_func=rl_step_func_multi)
+    building = Building(name=1, elevators=[Elevator(elevator_num, max_riders=2) for elevator_num in range(0, 2)],
+                        n_floors=6, board_at_last_stop=True)
+    sim.init_building(building)
+    person_scheduler = PersonScheduler(building, poisson_mean_density=.2, p_seed=5, seconds_to_schedule=600)
+
+    policy = CollectiveControlPolicy()
+    step_num = 0
+    while sim.total_time < 600 or building.get_total_people_in_system() > 0:
+        sim.rl_step(starting_time=sim.total_time, action=policy(sim, None, step_num),
+                    person_scheduler=person_scheduler)
+        step_num += 1
+        # A floor's call is on exactly while people wait to go that way
+        for floor in building.floors:
+            assert floor.up_pressed == (len(floor.people_going_up) > 0)
+            assert floor.down_pressed == (len(floor.people_going_down) > 0)
+        assert sim.total_time < 2000
+    assert len(building.delivered_wait_times) == len(person_scheduler.spawn_times)
+
+
+def test_eta_considers_loaded_elevators():
+    sim = Simulator('dispatch', step_func=realistic_physics_step_func, reward_func=reward_sum_people,
+                    rl_step_func=rl_step_func_multi)
+    building = Building(name=1, elevators=[Elevator(elevator_num) for elevator_num in range(0, 2)], n_floors=10,
+                        board_at_last_stop=True)
+    sim.init_building(building)
+    # Elevator 0 is on floor 5 with a rider for floor 6 (queued); elevator 1 is empty and idle on floor 0
+    loaded_elevator, empty_elevator = building.elevators
+    loaded_elevator.position = 5 * building.floor_dist
+    loaded_elevator.add_rider(Person(5, 6))
+    loaded_elevator.queued_floors.append(building.floors[6])
+    building.update_people_counts()
+    building.add_waiting_person(Person(7, 2))
+
+    assert loaded_elevator.estimate_arrival_time(7, building) < empty_elevator.estimate_arrival_time(7, building)
+    # The loaded elevator gets there first, so it reserves the call and the empty one stays put
+    eta_policy = EtaPolicy()
+    assert eta_policy(sim, None, 0) == [None, None]
+    assert eta_policy.claimed[7]
+    assert NearestCarPolicy()(sim, None, 0) == [None, 7]  # only idle elevators
+
+    # With two more riders for floor 0 the loaded elevator is slower, and the call goes to the empty one
+    loaded_elevator.add_rider(Person(5, 0))
+    loaded_elevator.add_rider(Person(5, 0))
+    building.update_people_counts()
+    assert eta_policy(sim, None, 1) == [None, 7]
+
+    try:
+        DispatchPolicy()
+        assert False, "DispatchPolicy is abstract"
+    except TypeError:
+        pass
+
+
+def test_eta_no_worse_than_nearest_car():
+    # Saturated (the elevators are never idle long) and light traffic, 20 floors and 4 elevators
+    for poisson_mean_density, episode_seconds in [(.5, 5000), (.05, 20000)]:
+        mean_wait_times = []
+        for policy_class in [NearestCarPolicy, EtaPolicy]:
+            config = RolloutConfig(n_floors=20, n_elevators=4, poisson_mean_density=poisson_mean_density,
+                                   episode_seconds=episode_seconds, seed=1, policy=policy_class(),
+                                   rl_step_func=rl_step_func_multi)
+            mean_wait_times.append(EpisodeRunner(config).run_episode(0)["mean_wait_time"])
+        nearest_car_wait_time, eta_wait_time = mean_wait_times
+        assert eta_wait_time <= nearest_car_wait_time, (poisson_mean_density, mean_wait_times)
+
+
+def test_policies_in_sweep():
+    base_config = RolloutConfig(n_floors=8, n_elevators=2, episode_seconds=2000, rl_step_func=rl_step_func_multi)
+    runner = SweepRunner({"policy": [policy_class() for policy_class in POLICIES]}, base_config, n_episodes=1,
+                         cache_dir=None, max_workers=0)
+    results = runner.run()
+    assert runner.n_computed == len(POLICIES)
+    assert all(result["metrics"]["n_delivered"] > 0 for result in results)
+
+
+def run_tests():
+    test_policies_deliver_everyone()
+    test_full_elevator_leaves_call_on()
+    test_eta_considers_loaded_elevators()
+    test_eta_no_worse_than_nearest_car()
+    test_policies_in_sweep()
+
+
+if __name__ == '__main__':
+    run_tests()
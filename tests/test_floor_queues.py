@@ -0,0 +1,97 @@
+from src.Person import Person
+from src.building import Building
+from src.elevator import Elevator
+from src.floor import Floor
+
+
+def test_floor_direction_queues():
+    floor = Floor(3)
+    destinations = [5, 1, 7, 0, 9, 2]
+    people = [Person(3, destination) for destination in destinations]
+    for person in people:
+        floor.add_person(person)
+
+    assert floor.get_num_people_waiting() == 6
+    assert floor.people_waiting == tuple(people)
+    assert list(floor.people_going_up) == [people[0], people[2], people[4]]
+
+    token = floor.snapshot()
+    assert floor.pop_people_going_down(2) == [people[1], people[3]]
+    assert floor.pop_people(3) == [people[0], people[2], people[4]]
+    assert floor.people_waiting == (people[5],)
+
+    floor.restore(token)
+    assert floor.people_waiting == tuple(people)
+    assert floor.pop_people_going_up(10) == [people[0], people[2], people[4]]
+
+
+def test_elevator_riders_by_destination():
+    elevator = Elevator(1)
+    building = Building(name=1, elevators=[elevator], n_floors=10)
+    for destination in [4, 6, 4, 8, 4]:
+        building.add_waiting_person(Person(0, destination))
+    elevator.queued_floors.append(building.floors[0])
+    elevator.load_unload(0, building, time_remaining=0, time_inc=0)
+    assert elevator.get_num_riders() == 5
+    assert [len(elevator.riders_by_destination[floor_num]) for floor_num in [4, 6, 8]] == [3, 1, 1]
+
+    elevator.queued_floors.append(building.floors[4])
+    elevator.load_unload(4, building, time_remaining=0, time_inc=0)
+    assert elevator.get_num_riders() == 2
+    assert sorted(rider.destination for rider in elevator.riders) == [6, 8]
+    assert len(building.delivered_wait_times) == 3
+    assert building.rider_counts == [2]
+    assert building.get_total_people_in_system() == 2
+
+    # riders and people_waiting are read-only: changing them directly would leave the counts out of sync
+    for people in [elevator.riders, building.floors[0].people_waiting]:
+        try:
+            people.append(Person(0, 5))
+            assert False, "riders and people_waiting are read-only"
+        except AttributeError:
+            pass
+
+
+def load_full_elevator(n_elevators, queued_floor_nums, board_at_last_stop=False):
+    # Elevator 0 (room for 2) loads on floor 3, where 3 people wait to go up and 2 to go down
+    building = Building(name=1, elevators=[Elevator(elevator_num, max_riders=2) for elevator_num in
+                                           range(0, n_elevators)], n_floors=10, board_at_last_stop=board_at_last_stop)
+    for destination in [5, 1, 7, 0, 9]:
+        building.add_waiting_person(Person(3, destination))
+    elevator = building.elevators[0]
+    elevator.position = 3 * building.floor_dist
+    elevator.queued_floors[:] = [building.floors[floor_num] for floor_num in queued_floor_nums]
+    elevator.load_unload(3, building, time_remaining=0, time_inc=0)
+    return building.floors[3], elevator
+
+
+def test_calls_left_on_for_people_left_behind():
+    # Going up next: 2 of the 3 people going up get on; the up call stays on for the third
+    floor, elevator = load_full_elevator(2, [3, 8])
+    assert sorted(rider.destination for rider in elevator.riders) == [5, 7]
+    assert floor.up_pressed and floor.down_pressed
+
+    # Room for everyone going down: the down call goes off, the up call stays on
+    floor, elevator = load_full_elevator(2, [3, 0])
+    assert sorted(rider.destination for rider in elevator.riders) == [0, 1]
+    assert floor.up_pressed and not floor.down_pressed
+
+    # Last stop with board_at_last_stop: the first 2 to arrive get on, both calls stay on for the others
+    floor, elevator = load_full_elevator(2, [3], board_at_last_stop=True)
+    assert sorted(rider.destination for rider in elevator.riders) == [1, 5]
+    assert floor.up_pressed and floor.down_pressed
+
+    # Single elevator (RL v1 observation): both buttons go off even though people are left
+    floor, elevator = load_full_elevator(1, [3])
+    assert elevator.get_num_riders() == 2 and floor.get_num_people_waiting() == 3
+    assert not floor.up_pressed and not floor.down_pressed
+
+
+def run_tests():
+    test_floor_direction_queues()
+    test_elevator_riders_by_destination()
+    test_calls_left_on_for_people_left_behind()
+
+
+if __name__ == '__main__':
+    run_tests()
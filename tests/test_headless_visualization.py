@@ -0,0 +1,38 @@
+import sys
+
+from src.PersonScheduler import PersonScheduler
+from src.Visualization.visualization import HeadlessVisualization, Visualization, create_visualization
+from src.building import Building
+from src.elevator import Elevator
+from src.simulator import Simulator, realistic_physics_step_func, reward_sum_people, rl_step_func_v1
+
+
+def test_import_does_not_open_window():
+    # The window is only created by the first Visualization
+    if Visualization.pyglet_window is None:
+        assert "pyglet.window" not in sys.modules
+
+
+def test_headless_loop():
+    sim = Simulator('headless', step_func=realistic_physics_step_func, reward_func=reward_sum_people,
+                    rl_step_func=rl_step_func_v1)
+    building = Building(name=1, elevators=[Elevator(1)], n_floors=10)
+    sim.init_building(building)
+    person_scheduler = PersonScheduler(building, poisson_mean_density=.05, seconds_to_schedule=10000)
+
+    vis = create_visualization(building, headless=True)
+    assert isinstance(vis, HeadlessVisualization)
+    for step_num in range(0, 20):
+        assert vis.alive == 1
+        vis.render()
+        sim.rl_step(starting_time=sim.total_time, action=(step_num + 1) % 10, person_scheduler=person_scheduler)
+    assert sim.total_time > 0
+
+
+def run_tests():
+    test_import_does_not_open_window()
+    test_headless_loop()
+
+
+if __name__ == '__main__':
+    run_tests()
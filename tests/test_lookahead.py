@@ -0,0 +1,65 @@
+import numpy as np
+
+from src.Person import Person
+from src.dispatch import CollectiveControlPolicy
+from src.lookahead import LookaheadPlanner
+from src.rollout_pool import EpisodeRunner, RolloutConfig
+from src.simulator import rl_step_func_multi
+
+
+def test_plan_leaves_sim_untouched():
+    config = RolloutConfig(n_floors=8, poisson_mean_density=.1, seed=2)
+    runner = EpisodeRunner(config)
+    sim = runner.sim
+    for step_num in range(0, 20):
+        sim.rl_step(starting_time=sim.total_time, action=(step_num * 3 + 1) % 8,
+                    person_scheduler=runner.person_scheduler)
+    total_time = sim.total_time
+    state = sim.get_state()[1].copy()
+    positions = [elevator.position for elevator in sim.building.elevators]
+
+    with LookaheadPlanner(config, n_branches=3, horizon=5, max_workers=0) as planner:
+        action = planner.plan(sim)
+    assert action in range(0, 8)
+    assert sorted(planner.mean_rewards) == list(range(0, 8))
+    assert max(planner.mean_rewards.values()) == planner.mean_rewards[action]
+    assert sim.total_time == total_time
+    assert np.array_equal(sim.get_state()[1], state)
+    assert [elevator.position for elevator in sim.building.elevators] == positions
+
+
+def test_plan_picks_waiting_floor():
+    # Nobody arrives during the lookahead; the one person waiting is best picked up right away
+    config = RolloutConfig(n_floors=10, poisson_mean_density=0, seed=1)
+    runner = EpisodeRunner(config)
+    runner.sim.building.add_waiting_person(Person(6, 2))
+    with LookaheadPlanner(config, n_branches=2, horizon=4, max_workers=0) as planner:
+        assert planner.plan(runner.sim) == 6
+
+
+def test_workers_match_in_process():
+    config = RolloutConfig(n_floors=6, n_elevators=2, poisson_mean_density=.1, seed=5,
+                           policy=CollectiveControlPolicy(), rl_step_func=rl_step_func_multi)
+    results = []
+    for max_workers in [0, 2]:
+        runner = EpisodeRunner(config)
+        sim = runner.sim
+        all_mean_rewards = []
+        with LookaheadPlanner(config, n_branches=3, horizon=4, max_workers=max_workers) as planner:
+            for _ in range(0, 5):
+                action = planner.plan(sim)
+                assert isinstance(action, list) and len(action) == 2
+                all_mean_rewards.append(planner.mean_rewards)
+                sim.rl_step(starting_time=sim.total_time, action=action, person_scheduler=runner.person_scheduler)
+        results.append((all_mean_rewards, sim.total_time))
+    assert results[0] == results[1]
+
+
+def run_tests():
+    test_plan_leaves_sim_untouched()
+    test_plan_picks_waiting_floor()
+    test_workers_match_in_process()
+
+
+if __name__ == '__main__':
+    run_tests()
@@ -0,0 +1,89 @@
+import copy
+import random
+
+import numpy as np
+
+from src.Person import Person
+from src.PersonScheduler import PersonScheduler
+from src.simulator import *
+from src.building import *
+from src.elevator import *
+
+
+def rebuild_state(building):
+    # The state list as get_state used to build it from scratch
+    states = []
+    for elevator in building.elevators:
+        dest_floors_dict = dict()
+        for rider in elevator.riders:
+            dest_floors_dict[rider.destination] = dest_floors_dict.get(rider.destination, 0) + 1
+        for floor in building.floors:
+            states.append(dest_floors_dict.get(floor.floor_number, 0))
+    for floor in building.floors:
+        states.append(int(floor.up_pressed is True))
+        states.append(int(floor.down_pressed is True))
+    for floor in building.floors:
+        states.append(len(floor.people_waiting))
+    return states
+
+
+def test_observation_updated_in_place():
+    rnd = random.Random(1)
+    n_floors = 12
+    sim = Simulator('observation', step_func=realistic_physics_step_func)
+    building = Building(name=1, elevators=[Elevator(i) for i in range(0, 4)], n_floors=n_floors)
+    sim.init_building(building)
+
+    state = building.observation
+    bld, first_state = sim.get_state()
+    assert first_state is not state and np.array_equal(first_state, state)
+    for step_num in range(0, 600):
+        for elevator in building.elevators:
+            if len(elevator.queued_floors) < 2 and rnd.random() < .3:
+                elevator.queued_floors.append(building.floors[rnd.randrange(n_floors)])
+        if rnd.random() < .5:
+            floor_num = rnd.randrange(n_floors)
+            building.add_waiting_person(Person(floor_num, (floor_num + 1 + rnd.randrange(n_floors - 1)) % n_floors))
+        sim.step(rnd.choice([.5, 1, 3]))
+
+        # The building's observation follows it; the state returned before the loop does not
+        assert state.tolist() == rebuild_state(building)
+        if step_num == 300:
+            token = sim.snapshot()
+            saved_state = state.copy()
+            branch = copy.deepcopy(sim)
+    assert sum(len(elevator.riders) for elevator in building.elevators) > 0
+    assert not any(first_state)
+
+    sim.restore(token)
+    assert np.array_equal(state, saved_state)
+    assert state.tolist() == rebuild_state(building)
+    assert branch.get_state()[1].tolist() == rebuild_state(branch.building) == saved_state.tolist()
+
+    out = np.zeros(len(state))
+    assert sim.get_state(out=out)[1] is out
+    assert np.array_equal(out, state)
+
+
+def test_rl_step_states_can_be_kept():
+    sim = Simulator('observation', step_func=realistic_physics_step_func, reward_func=reward_sum_people,
+                    rl_step_func=rl_step_func_v1)
+    building = Building(name=1, elevators=[Elevator(0)], n_floors=8)
+    sim.init_building(building)
+    person_scheduler = PersonScheduler(building, poisson_mean_density=.3, p_seed=3, seconds_to_schedule=1000)
+    kept_states = []
+    for step_num in range(0, 40):
+        state_list, reward, bld = sim.rl_step(starting_time=sim.total_time, action=(step_num * 3 + 1) % 8,
+                                              person_scheduler=person_scheduler)
+        kept_states.append((state_list, state_list.tolist()))
+    assert all(state_list.tolist() == saved for state_list, saved in kept_states)
+    assert len(set(tuple(saved) for state_list, saved in kept_states)) > 1
+
+
+def run_tests():
+    test_observation_updated_in_place()
+    test_rl_step_states_can_be_kept()
+
+
+if __name__ == '__main__':
+    run_tests()
@@ -0,0 +1,138 @@
+import numpy as np
+
+from src.PersonScheduler import PersonScheduler
+from src.building import Building
+from src.elevator import Elevator
+from src.random_streams import replica_seed_sequence
+
+
+def test_arrival_columns():
+    building = Building(name=1, elevators=[Elevator(1)], n_floors=10)
+    ps = PersonScheduler(building, poisson_mean_density=.05, p_seed=3, seconds_to_schedule=100000)
+
+    n_points = len(ps.spawn_times)
+    assert n_points > 0
+    assert len(ps.spawn_starting_floors) == len(ps.spawn_dest_floors) == len(ps.spawn_ids) == n_points
+    assert np.all(np.diff(ps.spawn_times) >= 0)
+    assert np.all((ps.spawn_times >= 0) & (ps.spawn_times <= 100000))
+    assert np.all((ps.spawn_starting_floors >= 0) & (ps.spawn_starting_floors < 10))
+    assert np.all((ps.spawn_dest_floors >= 0) & (ps.spawn_dest_floors < 10))
+    assert not np.any(ps.spawn_starting_floors == ps.spawn_dest_floors)
+    assert list(ps.spawn_ids) == list(range(0, n_points))
+
+    # Same seed, same arrivals
+    ps_again = PersonScheduler(building, poisson_mean_density=.05, p_seed=3, seconds_to_schedule=100000)
+    assert np.array_equal(ps.spawn_times, ps_again.spawn_times)
+    assert np.array_equal(ps.spawn_dest_floors, ps_again.spawn_dest_floors)
+
+    timestamp, people = ps.get_time_and_people_of_next_addition(0)
+    assert timestamp == ps.spawn_times[0]
+    assert people[0].floor == ps.spawn_starting_floors[0]
+    assert people[0].destination == ps.spawn_dest_floors[0]
+
+
+def test_streaming_chunks():
+    building = Building(name=1, elevators=[Elevator(1)], n_floors=10)
+    ps = PersonScheduler(building, poisson_mean_density=.5, p_seed=4, seconds_to_schedule=float("inf"),
+                         chunk_seconds=100)
+    assert ps.chunk_end == 100
+    assert len(ps.spawn_times) > 0
+
+    # Walk through many chunks; ids and times keep increasing and only one chunk is held at a time
+    timestamp = 0
+    last_timestamp = -1
+    n_spawned = 0
+    token = None
+    while timestamp < 1000:
+        if token is None and timestamp > 450:
+            token = ps.snapshot()
+            token_timestamp = timestamp
+        timestamp, people = ps.get_time_and_people_of_next_addition(timestamp, exclusive=True)
+        assert timestamp > last_timestamp
+        assert ps.chunk_start <= timestamp < ps.chunk_end
+        last_timestamp = timestamp
+        n_spawned += len(people)
+    assert ps.chunk_start >= 900
+    assert len(ps.spawn_times) < 100
+    assert ps.spawn_ids[0] == ps.n_generated
+    assert 400 < n_spawned < 600
+
+    # Going back to a snapshot replays the same arrivals, including the chunks generated after it
+    ps.restore(token)
+    replay_timestamp = token_timestamp
+    while replay_timestamp < 1000:
+        replay_timestamp, people = ps.get_time_and_people_of_next_addition(replay_timestamp, exclusive=True)
+    assert replay_timestamp == timestamp
+
+    # A bounded streaming horizon still ends
+    ps = PersonScheduler(building, poisson_mean_density=.5, p_seed=4, seconds_to_schedule=250, chunk_seconds=100)
+    assert ps.get_time_and_people_of_next_addition(249.99, exclusive=True) == (-1.0, [])
+    assert ps.chunk_end == 250
+
+
+def test_lookups_in_any_order():
+    building = Building(name=1, elevators=[Elevator(1)], n_floors=10)
+    ps = PersonScheduler(building, poisson_mean_density=.05, p_seed=3, seconds_to_schedule=100000)
+    times = ps.spawn_times
+
+    for query_index in [4000, 10, 2500, 0, len(times) - 1, 3]:
+        timestamp, people = ps.get_time_and_people_of_next_addition(times[query_index])
+        assert timestamp == times[query_index]
+        timestamp, people = ps.get_time_and_people_of_next_addition(times[query_index], exclusive=True)
+        if query_index == len(times) - 1:
+            assert (timestamp, people) == (-1.0, [])
+        else:
+            assert timestamp == times[query_index + 1]
+            assert people[0].destination == ps.spawn_dest_floors[query_index + 1]
+
+    # Batch lookup
+    spawn_times, starting_floors, dest_floors = ps.get_arrivals_between(times[100], times[200])
+    assert list(spawn_times) == list(times[100:200])
+    assert list(dest_floors) == list(ps.spawn_dest_floors[100:200])
+    spawn_times, starting_floors, dest_floors = ps.get_arrivals_between(times[100], times[200], exclusive=True)
+    assert list(spawn_times) == list(times[101:200])
+
+    # Batch lookups in streaming mode span chunks and match the one-at-a-time lookups
+    ps = PersonScheduler(building, poisson_mean_density=.5, p_seed=4, seconds_to_schedule=float("inf"),
+                         chunk_seconds=100)
+    spawn_times, starting_floors, dest_floors = ps.get_arrivals_between(50, 420)
+    assert ps.chunk_start == 400
+    assert np.all((spawn_times >= 50) & (spawn_times < 420)) and np.all(np.diff(spawn_times) > 0)
+    ps.reseed(4)
+    timestamp, people = ps.get_time_and_people_of_next_addition(50)
+    single_times = []
+    while timestamp < 420:
+        single_times.append(timestamp)
+        timestamp, people = ps.get_time_and_people_of_next_addition(timestamp, exclusive=True)
+    assert single_times == list(spawn_times)
+
+
+def test_independent_streams():
+    building = Building(name=1, elevators=[Elevator(1)], n_floors=10)
+    ps = PersonScheduler(building, poisson_mean_density=.05, p_seed=3, seconds_to_schedule=10000)
+
+    # The global NumPy state has no effect on the arrivals
+    np.random.seed(0)
+    ps_again = PersonScheduler(building, poisson_mean_density=.05, p_seed=3, seconds_to_schedule=10000)
+    assert np.array_equal(ps.spawn_times, ps_again.spawn_times)
+    assert np.array_equal(ps.spawn_starting_floors, ps_again.spawn_starting_floors)
+
+    # Replicas of one root seed differ from each other and are reproducible one by one
+    replicas = [PersonScheduler(building, poisson_mean_density=.05, p_seed=replica_seed_sequence(3, replica_index),
+                                seconds_to_schedule=10000) for replica_index in range(0, 3)]
+    assert not np.array_equal(replicas[0].spawn_times[:10], replicas[1].spawn_times[:10])
+    assert not np.array_equal(replicas[1].spawn_times[:10], replicas[2].spawn_times[:10])
+    children = np.random.SeedSequence(3).spawn(3)
+    ps_child = PersonScheduler(building, poisson_mean_density=.05, p_seed=children[2], seconds_to_schedule=10000)
+    assert np.array_equal(ps_child.spawn_times, replicas[2].spawn_times)
+
+
+def run_tests():
+    test_arrival_columns()
+    test_streaming_chunks()
+    test_lookups_in_any_order()
+    test_independent_streams()
+
+
+if __name__ == '__main__':
+    run_tests()
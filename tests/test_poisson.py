@@ -51,6 +51,6 @@ building = Building(name=1, elevators=elevators, n_floors=10)
 sim.init_building(building)
 
 ps = PersonScheduler(building)  # , seconds_to_schedule=50)
-print(ps.people_spawning[:20])
+print(ps.spawn_times[:20], ps.spawn_starting_floors[:20], ps.spawn_dest_floors[:20])
 print(ps.get_time_and_people_of_next_addition(20))
 
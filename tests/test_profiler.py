@@ -0,0 +1,69 @@
+from src.PersonScheduler import PersonScheduler
+from src.building import Building
+from src.elevator import Elevator
+import src.simulator as simulator_module
+from src.simulator import Simulator, realistic_physics_step_func, reward_sum_people, rl_step_func_v1
+
+
+def make_sim():
+    sim = Simulator('profiled', step_func=realistic_physics_step_func, reward_func=reward_sum_people,
+                    rl_step_func=rl_step_func_v1)
+    building = Building(name=1, elevators=[Elevator(1)], n_floors=10)
+    sim.init_building(building)
+    person_scheduler = PersonScheduler(building, poisson_mean_density=.1, p_seed=2, seconds_to_schedule=10000)
+    return sim, person_scheduler
+
+
+def run_steps(sim, person_scheduler, n_steps=200):
+    rewards = []
+    for step_num in range(0, n_steps):
+        state, reward, bld = sim.rl_step(starting_time=sim.total_time, action=(step_num * 3 + 1) % 10,
+                                         person_scheduler=person_scheduler)
+        rewards.append(reward)
+    return rewards, sim.total_time
+
+
+def test_profiling():
+    original_functions = (Elevator.load_unload, simulator_module.realistic_physics_step_func,
+                          PersonScheduler.get_time_and_people_of_next_addition)
+    sim, person_scheduler = make_sim()
+    unprofiled = run_steps(sim, person_scheduler)
+
+    sim, person_scheduler = make_sim()
+    profiler = sim.enable_profiling()
+    other_sim, other_person_scheduler = make_sim()
+    try:
+        other_sim.enable_profiling()
+        assert False, "only one Simulator can be profiled at a time"
+    except RuntimeError:
+        pass
+    assert run_steps(sim, person_scheduler) == unprofiled
+    assert sim.disable_profiling() is profiler
+
+    report = profiler.report()
+    for name in ["rl_step_func", "realistic_physics_step_func", "load_unload", "scheduler.next_addition",
+                 "get_state", "reward", "physics_calc"]:
+        assert report[name]["calls"] > 0 and report[name]["total_seconds"] > 0
+    assert report["rl_step_func"]["calls"] == report["get_state"]["calls"] == report["reward"]["calls"] == 200
+    assert sum(report[name]["calls"] for name in report if name.startswith("physics_calc.")) > 0
+    assert "function" in profiler.format_report()
+
+    # Everything is back to the original functions
+    assert (Elevator.load_unload, simulator_module.realistic_physics_step_func,
+            PersonScheduler.get_time_and_people_of_next_addition) == original_functions
+    assert "get_state" not in vars(sim) and sim.rl_step_func is rl_step_func_v1
+
+    # The failed enable left nothing behind: once sim is done, other_sim can be profiled and counts its calls
+    assert other_sim.profiler is None
+    other_profiler = other_sim.enable_profiling()
+    run_steps(other_sim, other_person_scheduler, n_steps=20)
+    assert other_sim.disable_profiling() is other_profiler
+    assert other_profiler.report()["rl_step_func"]["calls"] == 20
+
+
+def run_tests():
+    test_profiling()
+
+
+if __name__ == '__main__':
+    run_tests()
@@ -27,14 +27,15 @@ def run_realistic_physics_test():
     building.floors[4].up_pressed = True
     building.floors[7].down_pressed = True
 
-    building.floors[1].people_waiting.append(Person(floor=1, destination=4))
-    building.floors[1].people_waiting.append(Person(floor=1, destination=4))
-    building.floors[1].people_waiting.append(Person(floor=1, destination=7))
-    building.floors[2].people_waiting.append(Person(floor=2, destination=6))
-    building.floors[4].people_waiting.append(Person(floor=4, destination=7))
-    building.floors[4].people_waiting.append(Person(floor=4, destination=7))
-    building.floors[4].people_waiting.append(Person(floor=4, destination=7))
-    building.floors[7].people_waiting.append(Person(floor=7, destination=3))
+    building.floors[1].add_person(Person(floor=1, destination=4))
+    building.floors[1].add_person(Person(floor=1, destination=4))
+    building.floors[1].add_person(Person(floor=1, destination=7))
+    building.floors[2].add_person(Person(floor=2, destination=6))
+    building.floors[4].add_person(Person(floor=4, destination=7))
+    building.floors[4].add_person(Person(floor=4, destination=7))
+    building.floors[4].add_person(Person(floor=4, destination=7))
+    building.floors[7].add_person(Person(floor=7, destination=3))
+    building.update_people_counts()
 
     # Custom event loop which dispatches an on_draw event, which updates the screen to the current state
     vis.pyglet_window.dispatch_event("on_draw")
@@ -0,0 +1,118 @@
+from src.PersonScheduler import PersonScheduler
+from src.building import Building
+from src.ElevatorState import ElevatorState
+from src.elevator import Elevator
+from src.simulator import Simulator, realistic_physics_step_func, reward_sum_people, rl_step_func_multi
+
+
+def busiest_floor_policy(sim, elevator_indexes):
+    # Idle elevators with riders go to the first rider's destination; empty ones go to the floor with the most people
+    # waiting, unless another elevator is already headed there
+    building = sim.building
+    action = [None] * len(building.elevators)
+    targets = set(floor.floor_number for elevator in building.elevators for floor in elevator.queued_floors)
+    for elevator_index in elevator_indexes:
+        elevator = building.elevators[elevator_index]
+        if elevator.get_num_riders() > 0:
+            action[elevator_index] = elevator.riders[0].destination
+        else:
+            waiting_counts = [count if floor_num not in targets else 0
+                              for floor_num, count in enumerate(building.people_waiting_counts.tolist())]
+            if max(waiting_counts) > 0:
+                action[elevator_index] = waiting_counts.index(max(waiting_counts))
+        if action[elevator_index] is not None:
+            targets.add(action[elevator_index])
+    return action
+
+
+def test_multi_elevator_steps():
+    sim = Simulator('multi', step_func=realistic_physics_step_func, reward_func=reward_sum_people,
+                    rl_step_func=rl_step_func_multi)
+    building = Building(name=1, elevators=[Elevator(elevator_num) for elevator_num in range(0, 3)], n_floors=10,
+                        board_at_last_stop=True)
+    sim.init_building(building)
+    person_scheduler = PersonScheduler(building, poisson_mean_density=.1, p_seed=3, seconds_to_schedule=20000)
+
+    # Nobody in the building: the first step skips to the first arrival
+    state_list, reward, bld = sim.rl_step(starting_time=0, action=[None, None, None], person_scheduler=person_scheduler)
+    assert sim.total_time == person_scheduler.spawn_times[0]
+    assert sim.get_elevators_needing_action() == [0, 1, 2]
+
+    n_decisions = [0, 0, 0]
+    while sim.total_time < 5000:
+        needing_action = sim.get_elevators_needing_action()
+        assert len(needing_action) > 0
+        for elevator_index in needing_action:
+            n_decisions[elevator_index] += 1
+        old_total_time = sim.total_time
+        sim.rl_step(starting_time=sim.total_time, action=busiest_floor_policy(sim, needing_action),
+                    person_scheduler=person_scheduler)
+        assert sim.total_time >= old_total_time
+        assert abs(building.clock - sim.total_time) < 1e-6
+        # Every elevator not reported is still busy
+        for elevator_index, elevator in enumerate(building.elevators):
+            if elevator_index not in sim.get_elevators_needing_action():
+                assert len(elevator.queued_floors) > 0 or elevator.state != ElevatorState.NO_ACTION
+
+    assert all(count > 10 for count in n_decisions)
+    assert len(building.delivered_wait_times) > 300
+    assert building.get_total_people_in_system() < 30
+
+
+def test_board_at_last_stop_is_building_state():
+    building = Building(name=1, elevators=[Elevator(elevator_num) for elevator_num in range(0, 2)], n_floors=6)
+    person_scheduler = PersonScheduler(building, poisson_mean_density=.1, p_seed=3, seconds_to_schedule=100)
+    try:
+        rl_step_func_multi(building, 0, [None, None], person_scheduler)
+        assert False, "rl_step_func_multi needs board_at_last_stop"
+    except ValueError:
+        pass
+    assert not building.board_at_last_stop
+
+    # Restoring a snapshot puts the flag back too
+    token = building.snapshot()
+    building.board_at_last_stop = True
+    building.restore(token)
+    assert not building.board_at_last_stop
+
+
+def test_pending_events_carry_over():
+    sim = Simulator('multi', step_func=realistic_physics_step_func, reward_func=reward_sum_people,
+                    rl_step_func=rl_step_func_multi)
+    building = Building(name=1, elevators=[Elevator(elevator_num) for elevator_num in range(0, 3)], n_floors=10,
+                        board_at_last_stop=True)
+    sim.init_building(building)
+    person_scheduler = PersonScheduler(building, poisson_mean_density=.1, p_seed=3, seconds_to_schedule=2000)
+    sim.rl_step(starting_time=0, action=[None, None, None], person_scheduler=person_scheduler)
+    event_queue = building.event_queue
+    token = sim.snapshot()
+
+    # The next call goes on with the same events
+    while sim.total_time < 1000:
+        action = busiest_floor_policy(sim, sim.get_elevators_needing_action())
+        sim.rl_step(starting_time=sim.total_time, action=action, person_scheduler=person_scheduler)
+        assert building.event_queue is event_queue
+    n_delivered = len(building.delivered_wait_times)
+
+    # Restoring a snapshot drops them, and the replay delivers the same people
+    sim.restore(token)
+    assert building.event_queue is None
+    while sim.total_time < 1000:
+        action = busiest_floor_policy(sim, sim.get_elevators_needing_action())
+        sim.rl_step(starting_time=sim.total_time, action=action, person_scheduler=person_scheduler)
+    assert len(building.delivered_wait_times) == n_delivered
+
+    # A call that does not start where the last one stopped starts over from the building's state
+    event_queue = building.event_queue
+    sim.rl_step(starting_time=sim.total_time + 1, action=[None, None, None], person_scheduler=person_scheduler)
+    assert building.event_queue is not event_queue
+
+
+def run_tests():
+    test_multi_elevator_steps()
+    test_board_at_last_stop_is_building_state()
+    test_pending_events_carry_over()
+
+
+if __name__ == '__main__':
+    run_tests()
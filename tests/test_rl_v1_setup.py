@@ -21,7 +21,8 @@ def run_rl_v1_test():
     # Note: poisson_mean_density=.2 (means average spawn .2 people per second), seconds_to_schedule=100000 (don't
     # exceed this system time which is tracked in sim.total_time).
     person_scheduler = PersonScheduler(building, poisson_mean_density=.05, seconds_to_schedule=100000)
-    print(person_scheduler.people_spawning[:10])
+    print(person_scheduler.spawn_times[:10], person_scheduler.spawn_starting_floors[:10],
+          person_scheduler.spawn_dest_floors[:10])
 
     # Custom event loop which dispatches an on_draw event, which updates the screen to the current state
     vis.pyglet_window.dispatch_event("on_draw")
@@ -0,0 +1,27 @@
+from src.rollout_pool import RolloutConfig, RolloutPool
+
+
+def run_pool(max_workers):
+    config = RolloutConfig(n_floors=8, poisson_mean_density=.1, episode_seconds=2000, seed=5)
+    with RolloutPool(config, max_workers=max_workers) as pool:
+        results = sorted(pool.run(4), key=lambda result: result["episode_index"])
+    # Timing varies from run to run; everything else must not
+    return [{key: value for key, value in result.items() if key != "steps_per_second"} for result in results]
+
+
+def test_results_independent_of_worker_count():
+    in_process = run_pool(0)
+    assert [result["episode_index"] for result in in_process] == [0, 1, 2, 3]
+    assert all(result["n_delivered"] > 0 for result in in_process)
+    assert in_process[0]["total_reward"] != in_process[1]["total_reward"]
+
+    assert run_pool(1) == in_process
+    assert run_pool(3) == in_process
+
+
+def run_tests():
+    test_results_independent_of_worker_count()
+
+
+if __name__ == '__main__':
+    run_tests()
@@ -0,0 +1,55 @@
+import copy
+
+from src.PersonScheduler import *
+from src.simulator import *
+from src.building import *
+from src.elevator import *
+
+
+def make_sim():
+    sim = Simulator('snapshot', step_func=realistic_physics_step_func, reward_func=reward_sum_wait_time,
+                    rl_step_func=rl_step_func_v1)
+    building = Building(name=1, elevators=[Elevator(1)], n_floors=10)
+    sim.init_building(building)
+    person_scheduler = PersonScheduler(building, poisson_mean_density=.2, seconds_to_schedule=20000)
+    return sim, person_scheduler
+
+
+def run_steps(sim, person_scheduler, actions):
+    results = []
+    for action in actions:
+        state_list, reward, bld = sim.rl_step(starting_time=sim.total_time, action=action,
+                                              person_scheduler=person_scheduler)
+        results.append((sim.total_time, reward, state_list.tolist()))
+    return results
+
+
+def test_restore_replays_identically():
+    sim, person_scheduler = make_sim()
+    run_steps(sim, person_scheduler, [(i * 3) % 10 for i in range(0, 40)])
+
+    token = sim.snapshot()
+    reference_sim = copy.deepcopy(sim)
+    actions = [(i * 7) % 10 for i in range(0, 40)]
+    first = run_steps(sim, person_scheduler, actions)
+
+    # Branch off in another direction, then come back to the snapshot twice
+    sim.restore(token)
+    run_steps(sim, person_scheduler, [9 - (i % 10) for i in range(0, 25)])
+    for _ in range(0, 2):
+        sim.restore(token)
+        assert run_steps(sim, person_scheduler, actions) == first
+
+    # Same trajectory as a deep copy taken at the snapshot
+    reference_scheduler = copy.deepcopy(person_scheduler)
+    reference_scheduler.building = reference_sim.building
+    reference_scheduler.restore(token[3])
+    assert run_steps(reference_sim, reference_scheduler, actions) == first
+
+
+def run_tests():
+    test_restore_replays_identically()
+
+
+if __name__ == '__main__':
+    run_tests()
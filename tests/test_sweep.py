@@ -0,0 +1,125 @@
+import functools
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from src.dispatch import CollectiveControlPolicy
+from src.rollout_pool import EpisodeRunner, RolloutConfig
+from src.simulator import rl_step_func_multi
+from src.sweep import ResultCache, SweepRunner, expand_grid, make_point_config
+
+
+class FixedFloorPolicy:
+    def __init__(self, floor_num):
+        self.floor_num = floor_num
+
+    def __call__(self, sim, state_list, step_num):
+        return self.floor_num
+
+
+def offset_floor_policy(sim, state_list, step_num, offset=0):
+    return (step_num + offset) % sim.building.n_floors
+
+
+def make_offset_policy(offset):
+    def policy(sim, state_list, step_num):
+        return offset_floor_policy(sim, state_list, step_num, offset)
+    return policy
+
+
+def test_expand_grid():
+    points = expand_grid({"n_floors": [5, 10], "max_velocity": [2.0, 2.5, 3.0]})
+    assert len(points) == 6
+    assert points[0] == {"n_floors": 5, "max_velocity": 2.0}
+    assert points[-1] == {"n_floors": 10, "max_velocity": 3.0}
+
+    config = make_point_config(RolloutConfig(), points[-1])
+    assert config.n_floors == 10 and config.elevator_kwargs == {"max_velocity": 3.0}
+    assert RolloutConfig().elevator_kwargs == {}
+
+
+def test_sweep_only_computes_new_points():
+    base_config = RolloutConfig(n_floors=6, episode_seconds=500, seed=2)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        runner = SweepRunner({"poisson_mean_density": [.05, .1], "avg_boarding_time": [3]}, base_config,
+                             n_episodes=2, cache_dir=cache_dir, max_workers=2)
+        results = runner.run()
+        assert runner.n_computed == 2
+        assert not any(result["cached"] for result in results)
+        assert all(result["metrics"]["n_delivered"] > 0 for result in results)
+
+        # One more value: only the new point is run, the others match the first run
+        runner = SweepRunner({"poisson_mean_density": [.05, .1, .2], "avg_boarding_time": [3]}, base_config,
+                             n_episodes=2, cache_dir=cache_dir, max_workers=0)
+        new_results = runner.run()
+        assert runner.n_computed == 1
+        assert [result["cached"] for result in new_results] == [True, True, False]
+        assert new_results[:2] == [dict(result, cached=True) for result in results]
+
+
+def test_cache_eviction():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ResultCache(cache_dir, max_entries=2)
+        cache.put("a", {"x": 1})
+        cache.put("b", {"x": 2})
+        # Make "a" the most recently used before adding a third entry
+        os.utime(cache.path("b"), (time.time() - 10, time.time() - 10))
+        assert cache.get("a") == {"x": 1}
+        cache.put("c", {"x": 3})
+        assert cache.get("b") is None
+        assert cache.get("a") == {"x": 1} and cache.get("c") == {"x": 3}
+
+        cache = ResultCache(cache_dir, max_bytes=os.path.getsize(cache.path("c")))
+        cache.put("d", {"x": 4})
+        assert [cache.get(key) for key in ["a", "c", "d"]] == [None, None, {"x": 4}]
+
+
+def test_point_keys():
+    runner = SweepRunner({}, n_episodes=1, cache_dir=None)
+    base_config = RolloutConfig(n_floors=6)
+    keys = [runner.point_key(make_point_config(base_config, {"policy": policy}))
+            for policy in [FixedFloorPolicy(1), FixedFloorPolicy(2), FixedFloorPolicy(1)]]
+    assert keys[0] != keys[1] and keys[0] == keys[2]
+
+    # A dispatching policy's per-episode state is not part of its key
+    config = RolloutConfig(n_floors=6, n_elevators=2, episode_seconds=200, policy=CollectiveControlPolicy(),
+                           rl_step_func=rl_step_func_multi)
+    key = runner.point_key(config)
+    EpisodeRunner(config).run_episode(0)
+    assert runner.point_key(config) == key
+
+    assert runner.point_key(make_point_config(base_config, {"seed": np.int64(3)})) == \
+        runner.point_key(make_point_config(base_config, {"seed": 3}))
+    try:
+        runner.point_key(make_point_config(base_config, {"seed": np.random.SeedSequence(3)}))
+        assert False, "SeedSequence seeds can't be cached"
+    except TypeError as error:
+        assert "seed" in str(error)
+
+    # Partials and bound methods are told apart by their arguments and instance
+    keys = [runner.point_key(make_point_config(base_config, {"policy": policy}))
+            for policy in [functools.partial(offset_floor_policy, offset=1),
+                           functools.partial(offset_floor_policy, offset=2), FixedFloorPolicy(1).__call__,
+                           FixedFloorPolicy(2).__call__]]
+    assert len(set(keys)) == 4
+
+    # Lambdas and closures all have the same name, so they can't be cached
+    for policy in [lambda sim, state_list, step_num: 1, make_offset_policy(1)]:
+        try:
+            runner.point_key(make_point_config(base_config, {"policy": policy}))
+            assert False, "functions without a unique name can't be cached"
+        except TypeError as error:
+            assert "policy" in str(error)
+
+
+def run_tests():
+    test_expand_grid()
+    test_sweep_only_computes_new_points()
+    test_cache_eviction()
+    test_point_keys()
+
+
+if __name__ == '__main__':
+    run_tests()
@@ -0,0 +1,55 @@
+import copy
+
+from src.building import Building
+from src.elevator import Elevator
+
+
+def test_trajectory_matches_physics():
+    elevator = Elevator(1, avg_boarding_time=4)
+    building = Building(name=1, elevators=[elevator], n_floors=12)
+    queued_floor_nums = [1, 9, 4]
+    elevator.queued_floors[:] = [building.floors[floor_num] for floor_num in queued_floor_nums]
+
+    trajectory = elevator.get_trajectory(building, start_time=100.0)
+    assert elevator.get_trajectory(building, start_time=100.0) is trajectory
+    assert trajectory.position(0.0) == 0.0 and trajectory.velocity(0.0) == 0.0
+    assert trajectory.position(trajectory.end_time + 5) == 4 * building.floor_dist
+
+    # Each stop is reached, at rest, when estimate_arrival_time says
+    for floor_num in queued_floor_nums:
+        arrival_time = 100.0 + elevator.estimate_arrival_time(floor_num, building)
+        assert abs(trajectory.position(arrival_time) - floor_num * building.floor_dist) < 1e-6
+        assert abs(trajectory.velocity(arrival_time)) < 1e-6
+
+    # Along the first two legs, the positions match stepping the physics by the same time in one call
+    first_arrival_time = elevator.estimate_arrival_time(1, building)
+    for time in [.5, 1.7, 3.0, first_arrival_time - .5]:
+        stepped = copy.deepcopy(elevator)
+        stepped.step_realistic_physics(building, time)
+        assert abs(trajectory.position(100.0 + time) - stepped.position) < 1e-9
+        assert abs(abs(trajectory.velocity(100.0 + time)) - abs(stepped.velocity)) < 1e-9
+
+    arrived = copy.deepcopy(elevator)
+    arrived.step_realistic_physics(building, first_arrival_time)
+    arrived.step_realistic_physics(building, arrived.avg_boarding_time)
+    for time in [.5, 2.5, 6.0, 11.0, 14.0]:
+        stepped = copy.deepcopy(arrived)
+        stepped.step_realistic_physics(building, time)
+        sample_time = 100.0 + first_arrival_time + elevator.avg_boarding_time + time
+        assert abs(trajectory.position(sample_time) - stepped.position) < 1e-9
+        assert trajectory.velocity(sample_time) > 0
+
+    # The trajectory of a moving elevator starts from its current motion
+    elevator.step_realistic_physics(building, 1.0)
+    moving = elevator.get_trajectory(building, start_time=101.0)
+    assert moving is not trajectory
+    for time in [101.0, 102.5, 110.0, 130.0]:
+        assert abs(moving.position(time) - trajectory.position(time)) < 1e-6
+
+
+def run_tests():
+    test_trajectory_matches_physics()
+
+
+if __name__ == '__main__':
+    run_tests()
@@ -0,0 +1,31 @@
+from src.building import Building
+from src.elevator import Elevator
+
+
+def test_travel_time_matrix_matches_kinematics():
+    elevators = [Elevator(1), Elevator(2), Elevator(3, max_velocity=5, max_acc=1.2, max_dec=-1)]
+    building = Building(name=1, elevators=elevators, n_floors=12)
+
+    # Same car type, same cached matrix
+    matrix = building.get_travel_time_matrix(elevators[0])
+    assert building.get_travel_time_matrix(elevators[1]) is matrix
+    assert building.get_travel_time_matrix(elevators[2]) is not matrix
+    assert matrix.shape == (12, 12)
+    assert not matrix.flags.writeable
+
+    # Short trips never reach max_velocity, long ones do; both match the closed-form time of a car at rest
+    for elevator in elevators:
+        for from_floor_num in range(0, 12):
+            elevator.position = from_floor_num * building.floor_dist
+            for to_floor_num in range(0, 12):
+                expected = elevator.calc_time_to_reach_position(to_floor_num * building.floor_dist) \
+                    if to_floor_num != from_floor_num else 0.0
+                assert abs(building.get_travel_time(elevator, from_floor_num, to_floor_num) - expected) < 1e-9
+
+
+def run_tests():
+    test_travel_time_matrix_matches_kinematics()
+
+
+if __name__ == '__main__':
+    run_tests()
@@ -0,0 +1,93 @@
+import numpy as np
+
+from src.PersonScheduler import *
+from src.random_streams import replica_seed_sequence
+from src.vec_simulator import VecSimulator
+from src.simulator import *
+from src.building import *
+from src.elevator import *
+
+
+def test_vec_simulator_matches_single_simulator():
+    vec_sim = VecSimulator(n_envs=3, n_floors=10, poisson_mean_density=.05, episode_seconds=5000, seed=1)
+
+    sim = Simulator('single', step_func=realistic_physics_step_func, reward_func=reward_sum_people,
+                    rl_step_func=rl_step_func_v1)
+    building = Building(name=1, elevators=[Elevator(1)], n_floors=10)
+    sim.init_building(building)
+    person_scheduler = PersonScheduler(building, poisson_mean_density=.05, p_seed=replica_seed_sequence(1, 0),
+                                       seconds_to_schedule=5000)
+
+    for step_num in range(0, 50):
+        actions = [(step_num + env_index) % 10 for env_index in range(0, 3)]
+        observations, rewards, dones, needs_action, infos = vec_sim.step(actions)
+        state_list, reward, bld = sim.rl_step(starting_time=sim.total_time, action=actions[0],
+                                              person_scheduler=person_scheduler)
+
+        assert observations.shape == (3, vec_sim.obs_dim)
+        assert rewards.shape == (3,)
+        assert np.array_equal(observations[0], state_list)
+        assert rewards[0] == reward
+
+
+def test_vec_simulator_auto_reset():
+    vec_sim = VecSimulator(n_envs=2, n_floors=5, poisson_mean_density=.1, episode_seconds=200, seed=3)
+
+    n_done = 0
+    for step_num in range(0, 200):
+        observations, rewards, dones, needs_action, infos = vec_sim.step([step_num % 5, (step_num + 2) % 5])
+        for env_index in range(0, 2):
+            if dones[env_index]:
+                n_done += 1
+                assert "terminal_observation" in infos[env_index]
+                assert vec_sim.sims[env_index].total_time == 0
+    assert n_done > 0
+    assert min(vec_sim.episode_counts) > 1
+
+
+def test_vec_simulator_drives_every_elevator():
+    vec_sim = VecSimulator(n_envs=2, n_floors=10, n_elevators=2, poisson_mean_density=.05, episode_seconds=5000,
+                           seed=1)
+    assert vec_sim.rl_step_func is rl_step_func_multi
+
+    sim = Simulator('single', step_func=realistic_physics_step_func, reward_func=reward_sum_people,
+                    rl_step_func=rl_step_func_multi)
+    building = Building(name=1, elevators=[Elevator(elevator_num) for elevator_num in range(0, 2)], n_floors=10,
+                        board_at_last_stop=True)
+    sim.init_building(building)
+    person_scheduler = PersonScheduler(building, poisson_mean_density=.05, p_seed=replica_seed_sequence(1, 0),
+                                       seconds_to_schedule=5000)
+
+    needs_action = vec_sim.needs_action
+    assert needs_action.shape == (2, 2) and needs_action.all()
+    for step_num in range(0, 50):
+        actions = [[(step_num + 3 * env_index + elevator_index * 5) % 10 if needs_action[env_index, elevator_index]
+                    else None for elevator_index in range(0, 2)] for env_index in range(0, 2)]
+        observations, rewards, dones, needs_action, infos = vec_sim.step(actions)
+        state_list, reward, bld = sim.rl_step(starting_time=sim.total_time, action=actions[0],
+                                              person_scheduler=person_scheduler)
+        assert np.array_equal(observations[0], state_list)
+        assert rewards[0] == reward
+        assert needs_action[0].tolist() == [elevator_index in sim.get_elevators_needing_action()
+                                            for elevator_index in range(0, 2)]
+        assert needs_action.any(axis=1).all()
+    assert all(elevator.position > 0 for elevator in vec_sim.sims[0].building.elevators)
+
+    observations, needs_action = vec_sim.reset()
+    assert not observations.any() and needs_action.all()
+
+    try:
+        VecSimulator(n_envs=1, n_elevators=2, rl_step_func=rl_step_func_v1)
+        assert False, "rl_step_func_v1 can't drive several elevators"
+    except ValueError:
+        pass
+
+
+def run_tests():
+    test_vec_simulator_matches_single_simulator()
+    test_vec_simulator_auto_reset()
+    test_vec_simulator_drives_every_elevator()
+
+
+if __name__ == '__main__':
+    run_tests()
@@ -0,0 +1,76 @@
+from src.PersonScheduler import PersonScheduler
+from src.building import Building
+from src.elevator import Elevator
+from src.simulator import Simulator, realistic_physics_step_func, reward_sum_wait_time, rl_step_func_v1
+
+
+def test_wait_times_from_timestamps():
+    sim = Simulator('wait', step_func=realistic_physics_step_func, reward_func=reward_sum_wait_time,
+                    rl_step_func=rl_step_func_v1)
+    building = Building(name=1, elevators=[Elevator(1)], n_floors=10)
+    sim.init_building(building)
+    person_scheduler = PersonScheduler(building, poisson_mean_density=.1, p_seed=6, seconds_to_schedule=10000)
+
+    delivered = []
+    for step_num in range(0, 300):
+        for person in building.elevators[0].riders:
+            if person.destination == (step_num + 1) % 10:
+                delivered.append(person)
+        state_list, reward, bld = sim.rl_step(starting_time=sim.total_time, action=(step_num + 1) % 10,
+                                              person_scheduler=person_scheduler)
+
+        clock = building.clock
+        assert abs(clock - sim.total_time) < 1e-6
+        people = list(building.elevators[0].riders)
+        for floor in building.floors:
+            people.extend(floor.people_waiting)
+        assert abs(reward + sum(person.get_wait_time(clock) for person in people)) < 1e-6
+
+        # The running counts match the floors and elevators
+        assert building.get_total_people_in_system() == len(people)
+        assert list(building.people_waiting_counts) == [len(floor.people_waiting) for floor in building.floors]
+        assert building.rider_counts == [len(building.elevators[0].riders)]
+        assert abs(building.sum_spawn_times - sum(person.spawn_time for person in people)) < 1e-6
+        for person in people:
+            assert person.spawn_time <= clock and person.alight_time is None
+            assert (person.board_time is None) == (person.waiting_state == -2)
+
+    assert len(building.delivered_wait_times) > 0
+    assert any(person.alight_time is not None for person in delivered)
+    for person in delivered:
+        if person.alight_time is not None:
+            assert person.spawn_time <= person.board_time <= person.alight_time
+            wait_time = person.get_wait_time(building.clock)
+            assert wait_time in building.delivered_wait_times
+            assert abs(person.get_hall_wait_time(0) + person.get_ride_time(0) - wait_time) < 1e-9
+
+
+def test_clock_follows_idle_steps():
+    # Few arrivals: most steps take the idle paths of rl_step_func_v1 (nobody in the system, or the action is the
+    # floor the elevator is on)
+    sim = Simulator('wait', step_func=realistic_physics_step_func, reward_func=reward_sum_wait_time,
+                    rl_step_func=rl_step_func_v1)
+    building = Building(name=1, elevators=[Elevator(1)], n_floors=10)
+    sim.init_building(building)
+    person_scheduler = PersonScheduler(building, poisson_mean_density=.01, p_seed=3, seconds_to_schedule=5000)
+
+    for step_num in range(0, 300):
+        floor_num = int(round(building.elevators[0].position / building.floor_dist))
+        action = floor_num if step_num % 3 == 0 else (step_num + 1) % 10
+        state_list, reward, bld = sim.rl_step(starting_time=sim.total_time, action=action,
+                                              person_scheduler=person_scheduler)
+        assert abs(building.clock - sim.total_time) < 1e-6
+        # The wait-time reward is measured up to the simulator's time
+        people = list(building.elevators[0].riders)
+        for floor in building.floors:
+            people.extend(floor.people_waiting)
+        assert abs(reward + sum(person.get_wait_time(sim.total_time) for person in people)) < 1e-6
+
+
+def run_tests():
+    test_wait_times_from_timestamps()
+    test_clock_follows_idle_steps()
+
+
+if __name__ == '__main__':
+    run_tests()